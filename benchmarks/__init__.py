@@ -0,0 +1 @@
+"""Benchmarks and a simulated FRITZ!Box for FRITZ!Box Tools."""
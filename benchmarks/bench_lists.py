@@ -0,0 +1,262 @@
+"""Benchmark the streaming list parser against xmltodict on large list payloads.
+
+Generates deflection lists, host lists, IGD port mapping lists, call lists and phonebooks
+with the given numbers of records and reports per payload and parser:
+
+- median wall time of a full parse into records
+- peak memory allocated during the parse (tracemalloc)
+
+`stream` feeds the payload in chunks and drops the records right away, like a consumer
+which handles every record on its own; its peak memory does not grow with the list.
+
+Usage::
+
+    python -m benchmarks.bench_lists --records 100 1000 10000 --repeat 5
+
+xmltodict is optional, its columns are skipped if it is not installed.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from xml.sax.saxutils import escape
+
+try:
+    import xmltodict
+except ImportError:
+    xmltodict = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK_SIZE = 16384
+
+
+def load_lists_module():
+    """Import lists.py of the integration without importing Home Assistant."""
+    path = os.path.join(REPO_DIR, "custom_components", "fritzbox_tools", "lists.py")
+    spec = importlib.util.spec_from_file_location("fritzbox_tools_lists", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _items(tag, records):
+    return "".join(
+        f"<{tag}>"
+        + "".join(
+            f"<{name}>{escape(str(value))}</{name}>" if value != "" else f"<{name} />"
+            for name, value in record.items()
+        )
+        + f"</{tag}>"
+        for record in records
+    )
+
+
+def deflection_list(count):
+    """Return a NewDeflectionList of X_AVM-DE_OnTel GetDeflections."""
+    records = (
+        {
+            "DeflectionId": idx,
+            "Enable": idx % 2,
+            "Type": "fromNumber",
+            "Number": f"0301234{idx:06d}",
+            "DeflectionToNumber": f"0171234{idx:06d}",
+            "Mode": "eImmediately",
+            "Outgoing": "",
+            "PhonebookID": "",
+        }
+        for idx in range(count)
+    )
+    return f"<List>{_items('Item', records)}</List>"
+
+
+def host_list(count):
+    """Return the file of Hosts X_AVM-DE_GetHostListPath."""
+    records = (
+        {
+            "Index": idx + 1,
+            "IPAddress": f"192.168.{idx // 250}.{idx % 250 + 2}",
+            "MACAddress": f"02:00:00:00:{idx // 256:02X}:{idx % 256:02X}",
+            "Active": int(idx % 3 != 0),
+            "HostName": f"host-{idx}",
+            "InterfaceType": "802.11" if idx % 2 else "Ethernet",
+            "X_AVM-DE_Port": idx % 4,
+            "X_AVM-DE_Speed": 1000,
+            "X_AVM-DE_UpdateAvailable": 0,
+            "X_AVM-DE_UpdateSuccessful": "unknown",
+            "X_AVM-DE_InfoURL": "",
+            "X_AVM-DE_Model": "",
+            "X_AVM-DE_URL": "",
+            "X_AVM-DE_Guest": 0,
+        }
+        for idx in range(count)
+    )
+    return f'<?xml version="1.0" encoding="utf-8"?><List>{_items("Item", records)}</List>'
+
+
+def port_mapping_list(count):
+    """Return a NewPortListing of IGD 2 GetListOfPortMappings."""
+    records = (
+        {
+            "p:NewRemoteHost": "",
+            "p:NewExternalPort": 10000 + idx,
+            "p:NewProtocol": "TCP",
+            "p:NewInternalPort": 8000 + idx,
+            "p:NewInternalClient": f"192.168.178.{idx % 250 + 2}",
+            "p:NewEnabled": 1,
+            "p:NewDescription": f"Forward {idx}",
+            "p:NewLeaseTime": 0,
+        }
+        for idx in range(count)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<p:PortMappingList xmlns:p="urn:schemas-upnp-org:gw:WANIPConnection">'
+        f"{_items('p:PortMappingEntry', records)}</p:PortMappingList>"
+    )
+
+
+def call_list(count):
+    """Return the file of X_AVM-DE_OnTel GetCallList."""
+    records = (
+        {
+            "Id": count - idx,
+            "Type": idx % 3 + 1,
+            "Caller": f"0301234{idx:06d}",
+            "Called": "SIP: 1234567",
+            "Name": f"Caller {idx}",
+            "Numbertype": "sip",
+            "Device": "Telefon",
+            "Port": 10,
+            "Date": "17.10.21 08:15",
+            "Duration": "0:05",
+            "Count": "",
+            "Path": "",
+        }
+        for idx in range(count)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><root><timestamp>1634451300</timestamp>'
+        f"{_items('Call', records)}</root>"
+    )
+
+
+def phonebook(count):
+    """Return the file of X_AVM-DE_OnTel GetPhonebook."""
+    contacts = "".join(
+        "<contact><category>0</category>"
+        f"<person><realName>Contact {idx}</realName></person>"
+        "<telephony>"
+        f'<number type="home" prio="1" id="0">0301234{idx:06d}</number>'
+        f'<number type="mobile" prio="0" id="1">0171234{idx:06d}</number>'
+        "</telephony>"
+        f"<uniqueid>{idx}</uniqueid></contact>"
+        for idx in range(count)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><phonebooks><phonebook name="Telefonbuch">'
+        f"{contacts}</phonebook></phonebooks>"
+    )
+
+
+def _xmltodict_records(content, path):
+    """Parse with xmltodict and return the records, fixing the single record quirk."""
+    node = xmltodict.parse(content)
+    for key in path[:-1]:
+        node = (node or {}).get(key) or {}
+    records = node.get(path[-1], [])
+    if not isinstance(records, list):
+        records = [records]
+    return records
+
+
+def measure(function, repeat):
+    """Return the median wall time and the peak traced memory of `function`."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def run(counts, repeat):
+    """Run the benchmark for all payloads and record counts, return the results."""
+    lists = load_lists_module()
+    payloads = [
+        ("deflections", deflection_list, lists.DEFLECTION, ["List", "Item"]),
+        ("hosts", host_list, lists.HOST, ["List", "Item"]),
+        (
+            "port_mappings",
+            port_mapping_list,
+            lists.PORT_MAPPING,
+            ["p:PortMappingList", "p:PortMappingEntry"],
+        ),
+        ("calls", call_list, lists.CALL, ["root", "Call"]),
+        ("phonebook", phonebook, lists.CONTACT, ["phonebooks", "phonebook", "contact"]),
+    ]
+    results = []
+    for (name, generate, record_type, path), count in (
+        (payload, count) for payload in payloads for count in counts
+    ):
+        content = generate(count).encode("utf-8")
+
+        def stream():
+            parser = lists.ListParser(record_type)
+            for offset in range(0, len(content), CHUNK_SIZE):
+                parser.feed(content[offset:offset + CHUNK_SIZE])
+            parser.close()
+
+        parsers = {
+            "parse_list": lambda: lists.parse_list(content, record_type),
+            "stream": stream,
+        }
+        if xmltodict is not None:
+            parsers["xmltodict"] = lambda: _xmltodict_records(content, path)
+
+        assert len(lists.parse_list(content, record_type)) == count
+        for parser_name, function in parsers.items():
+            seconds, peak = measure(function, repeat)
+            results.append(
+                {
+                    "payload": name,
+                    "records": count,
+                    "bytes": len(content),
+                    "parser": parser_name,
+                    "ms": round(seconds * 1000, 2),
+                    "peak_kib": round(peak / 1024, 1),
+                }
+            )
+    return results
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the results as json")
+    args = parser.parse_args()
+
+    results = run(args.records, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    if xmltodict is None:
+        print("xmltodict is not installed, comparing the list parser only")
+    print(f"{'payload':<14}{'records':>8}{'bytes':>11}  {'parser':<11}{'ms':>10}{'peak KiB':>11}")
+    for result in results:
+        print(
+            f"{result['payload']:<14}{result['records']:>8}{result['bytes']:>11}  "
+            f"{result['parser']:<11}{result['ms']:>10}{result['peak_kib']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Benchmark the setup of a config entry and full update cycles against the FRITZ!Box simulator.
+
+Sets up a real Home Assistant core with FRITZ!Box Tools as custom integration, pointed
+at `benchmarks.simulator`. For every combination of the given parameters it reports per
+phase (cold setup, update cycle, warm setup with cached service descriptions):
+
+- wall time
+- number of SOAP / web requests per (service, action)
+- time spent in the jobs of the worker pools of the integration (wall and thread cpu time)
+- peak memory allocated during the phase (tracemalloc)
+
+Usage::
+
+    python -m benchmarks.bench_setup --port-mappings 10 100 --wlan-configurations 2 4 --latency 0.01
+
+Access profiles are read from port 80 of the box, so `--profiles` > 0
+needs the permission to bind port 80.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_PORT, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.util import get_local_ip
+
+from .simulator import FritzBoxSimulator
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOMAIN = "fritzbox_tools"
+
+
+class ExecutorMeasurements:
+    """Time spent in the jobs of the worker pools of the integration, summed over all pools."""
+
+    def __init__(self):
+        """Init measurements."""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset the counters."""
+        with self._lock:
+            self.jobs = 0
+            self.wall_time = 0.0
+            self.thread_time = 0.0
+
+    def add(self, wall_time, thread_time):
+        """Add a finished job."""
+        with self._lock:
+            self.jobs += 1
+            self.wall_time += wall_time
+            self.thread_time += thread_time
+
+
+def instrument_executors(measurements):
+    """Make the integration create worker pools which measure their jobs into `measurements`."""
+    # pylint: disable=import-error
+    from custom_components.fritzbox_tools import executor as executor_module
+
+    class InstrumentedExecutor(executor_module.FritzBoxExecutor):
+        """Worker pool of a box which measures the time spent in jobs."""
+
+        def _run(self, job, func, args):
+            start, start_cpu = time.perf_counter(), time.thread_time()
+            try:
+                return super()._run(job, func, args)
+            finally:
+                measurements.add(time.perf_counter() - start, time.thread_time() - start_cpu)
+
+    # get_executor creates the pools of the boxes from this name
+    executor_module.FritzBoxExecutor = InstrumentedExecutor
+
+
+class Phase:
+    """Measure one phase of the benchmark."""
+
+    def __init__(self, name, simulator, executor):
+        """Init phase."""
+        self.name = name
+        self.simulator = simulator
+        self.executor = executor
+        self.result = None
+
+    async def __aenter__(self):
+        """Reset all counters."""
+        self.simulator.reset_calls()
+        self.executor.reset()
+        tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *args):
+        """Collect the results."""
+        wall_time = time.perf_counter() - self._start
+        calls = dict(self.simulator.calls)
+        self.result = {
+            "phase": self.name,
+            "wall_time": wall_time,
+            "requests": sum(calls.values()),
+            "connections": self.simulator.connections,
+            "calls": {f"{service}.{action}": count for (service, action), count in sorted(calls.items())},
+            "executor_jobs": self.executor.jobs,
+            "executor_wall_time": self.executor.wall_time,
+            "executor_thread_time": self.executor.thread_time,
+            "peak_memory": tracemalloc.get_traced_memory()[1],
+        }
+
+
+async def async_setup_hass(config_dir):
+    """Return a started Home Assistant core using `config_dir`. Custom components are imported from the repository."""
+    hass = HomeAssistant()
+    hass.config.config_dir = config_dir
+    hass.config.skip_pip = True
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    await hass.async_start()
+    return hass
+
+
+async def async_setup_entry(hass, simulator):
+    """Add and set up a config entry for the simulator."""
+    entry = config_entries.ConfigEntry(
+        version=1,
+        domain=DOMAIN,
+        title=simulator.host,
+        data={
+            CONF_HOST: simulator.host,
+            CONF_PORT: simulator.port,
+            CONF_USERNAME: simulator.username,
+            CONF_PASSWORD: simulator.password,
+            "profiles": list(simulator.profiles),
+            "use_hosts": True,
+        },
+        source=config_entries.SOURCE_USER,
+        connection_class=config_entries.CONN_CLASS_LOCAL_POLL,
+    )
+    await hass.config_entries.async_add(entry)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def async_run_scenario(scenario, latency, rounds, executor):
+    """Run all phases of one scenario, return the results of each phase."""
+    # pylint: disable=import-error
+    import custom_components.fritzbox_tools as fritzbox_tools_component
+    from custom_components.fritzbox_tools.const import DATA_FRITZ_TOOLS_INSTANCE
+
+    # the component only shows a deprecation notice unless this is disabled
+    fritzbox_tools_component.CONF_OUTDATED = False
+
+    results = []
+    simulator = FritzBoxSimulator(
+        web_port=80 if scenario["profiles"] else None,
+        latency=latency,
+        ha_ip=get_local_ip(),
+        **scenario,
+    )
+    with tempfile.TemporaryDirectory() as config_dir, simulator:
+        hass = await async_setup_hass(config_dir)
+        try:
+            async with Phase("setup (cold)", simulator, executor) as phase:
+                entry = await async_setup_entry(hass, simulator)
+            results.append(phase.result)
+
+            fritzbox_tools = hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE][entry.entry_id]
+            coordinator = fritzbox_tools.coordinator
+            for _ in range(rounds):
+                # make every source due, like the first cycle after setup
+                coordinator._next_update.clear()
+                async with Phase("update cycle", simulator, executor) as phase:
+                    await coordinator.async_refresh()
+                    await hass.async_block_till_done()
+                results.append(phase.result)
+
+            await hass.config_entries.async_unload(entry.entry_id)
+            async with Phase("setup (warm)", simulator, executor) as phase:
+                await hass.config_entries.async_setup(entry.entry_id)
+                await hass.async_block_till_done()
+            results.append(phase.result)
+        finally:
+            await hass.async_stop(force=True)
+    return results
+
+
+def print_results(scenario, results, verbose):
+    """Print the results of a scenario as table."""
+    print(", ".join(f"{key}={value}" for key, value in scenario.items()))
+    print(
+        f"  {'phase':<14} {'wall [ms]':>10} {'requests':>9} {'conns':>6} "
+        f"{'executor [ms]':>14} {'executor cpu [ms]':>18} {'peak [KiB]':>11}"
+    )
+    for result in results:
+        print(
+            f"  {result['phase']:<14} {result['wall_time'] * 1000:>10.1f} {result['requests']:>9} "
+            f"{result['connections']:>6} {result['executor_wall_time'] * 1000:>14.1f} "
+            f"{result['executor_thread_time'] * 1000:>18.1f} {result['peak_memory'] / 1024:>11.1f}"
+        )
+        if verbose:
+            for call, count in result["calls"].items():
+                print(f"      {count:>5} {call}")
+
+
+def main():
+    """Run the benchmark for every combination of the parameters."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port-mappings", type=int, nargs="+", default=[10])
+    parser.add_argument("--deflections", type=int, nargs="+", default=[3])
+    parser.add_argument("--profiles", type=int, nargs="+", default=[0])
+    parser.add_argument("--wlan-configurations", type=int, nargs="+", default=[3], choices=(2, 3, 4))
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request of the simulator")
+    parser.add_argument("--rounds", type=int, default=3, help="update cycles per scenario")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the calls per action")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_DIR)
+    executor = ExecutorMeasurements()
+    instrument_executors(executor)
+    tracemalloc.start()
+    all_results = []
+    for port_mappings, deflections, profiles, wlan_configurations in itertools.product(
+        args.port_mappings, args.deflections, args.profiles, args.wlan_configurations
+    ):
+        scenario = {
+            "port_mappings": port_mappings,
+            "deflections": deflections,
+            "profiles": profiles,
+            "wlan_configurations": wlan_configurations,
+        }
+        results = asyncio.run(async_run_scenario(scenario, args.latency, args.rounds, executor))
+        print_results(scenario, results, args.verbose)
+        all_results.append({"scenario": scenario, "latency": args.latency, "phases": results})
+
+    if args.json:
+        with open(args.json, "w") as fobj:
+            json.dump(all_results, fobj, indent=2)
+
+
+if __name__ == "__main__":
+    main()
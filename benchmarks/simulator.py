@@ -0,0 +1,1207 @@
+"""Local stand-in for a FRITZ!Box to run FRITZ!Box Tools against without a router.
+
+Serves the TR-064 / IGD description files, the SOAP actions used by the integration
+(with digest authentication) and the access profile pages of the web interface.
+UPnP event subscriptions (GENA) are supported for the connection and WLAN services,
+a TCP stand-in for the call monitor (port 1012) sends the call events given to it.
+Only the python standard library is used, so the simulator can be used by benchmarks
+and the async client as well as by fritzconnection and the profile session.
+
+Run it standalone with::
+
+    python -m benchmarks.simulator --port 49000 --web-port 8080 --port-mappings 40
+
+The access profiles are always read from port 80 of the host, so use ``--web-port 80`` (as root)
+if access profiles should be exercised by FRITZ!Box Tools itself.
+"""
+import argparse
+from collections import Counter
+import hashlib
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+import re
+import socket
+from socketserver import BaseRequestHandler, ThreadingTCPServer
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+from xml.etree import ElementTree as etree
+from xml.sax.saxutils import escape
+
+SOAP_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+REALM = "F!Box SOAP-Auth"
+EMPTY_SID = "0000000000000000"
+# online time column of the access profile overview
+PROFILE_OVERVIEW_STATES = {"unlimited": "unbegrenzt", "never": "gesperrt", "limited": "begrenzt"}
+
+# service name -> (service type, description file, actions)
+# actions: action name -> (in arguments, out arguments), arguments as (name, data type)
+PORT_MAPPING_ARGUMENTS = [
+    ("NewRemoteHost", "string"),
+    ("NewExternalPort", "ui2"),
+    ("NewProtocol", "string"),
+    ("NewInternalPort", "ui2"),
+    ("NewInternalClient", "string"),
+    ("NewEnabled", "boolean"),
+    ("NewPortMappingDescription", "string"),
+    ("NewLeaseDuration", "ui4"),
+]
+WLAN_ACTIONS = {
+    "GetInfo": (
+        [],
+        [
+            ("NewEnable", "boolean"),
+            ("NewStatus", "string"),
+            ("NewSSID", "string"),
+            ("NewChannel", "ui1"),
+            ("NewStandard", "string"),
+        ],
+    ),
+    "SetEnable": ([("NewEnable", "boolean")], []),
+}
+COMMON_LINK_PROPERTIES = (
+    [],
+    [
+        ("NewWANAccessType", "string"),
+        ("NewLayer1UpstreamMaxBitRate", "ui4"),
+        ("NewLayer1DownstreamMaxBitRate", "ui4"),
+        ("NewPhysicalLinkStatus", "string"),
+    ],
+)
+HOST_ARGUMENTS = [
+    ("NewIPAddress", "string"),
+    ("NewAddressSource", "string"),
+    ("NewLeaseTimeRemaining", "i4"),
+    ("NewMACAddress", "string"),
+    ("NewInterfaceType", "string"),
+    ("NewActive", "boolean"),
+    ("NewHostName", "string"),
+]
+HOST_LIST_PATH = "/devicehostlist.lua"
+# IGD 2 port listing, offered by the connection service if port_mapping_listing is set
+LIST_OF_PORT_MAPPINGS = (
+    [
+        ("NewStartPort", "ui2"),
+        ("NewEndPort", "ui2"),
+        ("NewProtocol", "string"),
+        ("NewManage", "boolean"),
+        ("NewNumberOfPorts", "ui2"),
+    ],
+    [("NewPortListing", "string")],
+)
+SERVICES = {
+    "DeviceInfo1": (
+        "urn:dslforum-org:service:DeviceInfo:1",
+        "tr64desc.xml",
+        {
+            "GetInfo": (
+                [],
+                [
+                    ("NewManufacturerName", "string"),
+                    ("NewModelName", "string"),
+                    ("NewDescription", "string"),
+                    ("NewProductClass", "string"),
+                    ("NewSerialNumber", "string"),
+                    ("NewSoftwareVersion", "string"),
+                    ("NewHardwareVersion", "string"),
+                    ("NewSpecVersion", "string"),
+                    ("NewProvisioningCode", "string"),
+                    ("NewUpTime", "ui4"),
+                    ("NewDeviceLog", "string"),
+                ],
+            ),
+        },
+    ),
+    "DeviceConfig1": (
+        "urn:dslforum-org:service:DeviceConfig:1",
+        "tr64desc.xml",
+        {"Reboot": ([], [])},
+    ),
+    "Layer3Forwarding1": (
+        "urn:dslforum-org:service:Layer3Forwarding:1",
+        "tr64desc.xml",
+        {
+            "GetDefaultConnectionService": (
+                [],
+                [("NewDefaultConnectionService", "string")],
+            ),
+        },
+    ),
+    "WANPPPConnection1": (
+        "urn:dslforum-org:service:WANPPPConnection:1",
+        "tr64desc.xml",
+        {
+            "GetPortMappingNumberOfEntries": (
+                [],
+                [("NewPortMappingNumberOfEntries", "ui2")],
+            ),
+            "GetGenericPortMappingEntry": (
+                [("NewPortMappingIndex", "ui2")],
+                PORT_MAPPING_ARGUMENTS,
+            ),
+            "GetSpecificPortMappingEntry": (
+                PORT_MAPPING_ARGUMENTS[:3],
+                PORT_MAPPING_ARGUMENTS[3:],
+            ),
+            "AddPortMapping": (PORT_MAPPING_ARGUMENTS, []),
+        },
+    ),
+    "WANCommonInterfaceConfig1": (
+        "urn:dslforum-org:service:WANCommonInterfaceConfig:1",
+        "tr64desc.xml",
+        {"GetCommonLinkProperties": COMMON_LINK_PROPERTIES},
+    ),
+    "Hosts1": (
+        "urn:dslforum-org:service:Hosts:1",
+        "tr64desc.xml",
+        {
+            "GetHostNumberOfEntries": ([], [("NewHostNumberOfEntries", "ui2")]),
+            "GetGenericHostEntry": ([("NewIndex", "ui2")], HOST_ARGUMENTS),
+            "X_AVM-DE_GetHostListPath": ([], [("NewX_AVM-DE_HostListPath", "string")]),
+            "X_AVM-DE_GetChangeCounter": ([], [("NewX_AVM-DE_GetChangeCounter", "ui4")]),
+        },
+    ),
+    "X_AVM-DE_OnTel1": (
+        "urn:dslforum-org:service:X_AVM-DE_OnTel:1",
+        "tr64desc.xml",
+        {
+            "GetNumberOfDeflections": ([], [("NewNumberOfDeflections", "ui2")]),
+            "GetDeflections": ([], [("NewDeflectionList", "string")]),
+            "SetDeflectionEnable": (
+                [("NewDeflectionId", "ui2"), ("NewEnable", "boolean")],
+                [],
+            ),
+        },
+    ),
+    "WANIPConn1": (
+        "urn:schemas-upnp-org:service:WANIPConnection:1",
+        "igddesc.xml",
+        {
+            "GetStatusInfo": (
+                [],
+                [
+                    ("NewConnectionStatus", "string"),
+                    ("NewLastConnectionError", "string"),
+                    ("NewUptime", "ui4"),
+                ],
+            ),
+            "GetExternalIPAddress": ([], [("NewExternalIPAddress", "string")]),
+            "X_AVM_DE_GetExternalIPv6Address": (
+                [],
+                [
+                    ("NewExternalIPv6Address", "string"),
+                    ("NewPrefixLength", "ui1"),
+                    ("NewValidLifetime", "ui4"),
+                    ("NewPreferedLifetime", "ui4"),
+                ],
+            ),
+            "ForceTermination": ([], []),
+        },
+    ),
+    "WANCommonIFC1": (
+        "urn:schemas-upnp-org:service:WANCommonInterfaceConfig:1",
+        "igddesc.xml",
+        {
+            "GetCommonLinkProperties": COMMON_LINK_PROPERTIES,
+            "GetAddonInfos": (
+                [],
+                [
+                    ("NewByteSendRate", "ui4"),
+                    ("NewByteReceiveRate", "ui4"),
+                    ("NewPacketSendRate", "ui4"),
+                    ("NewPacketReceiveRate", "ui4"),
+                    ("NewTotalBytesSent", "ui4"),
+                    ("NewTotalBytesReceived", "ui4"),
+                    ("NewX_AVM_DE_TotalBytesSent64", "string"),
+                    ("NewX_AVM_DE_TotalBytesReceived64", "string"),
+                ],
+            ),
+        },
+    ),
+}
+
+
+def _md5(value, encoding="utf-8"):
+    return hashlib.md5(value.encode(encoding)).hexdigest()
+
+
+def _bool(value):
+    return "1" if value else "0"
+
+
+class SoapError(Exception):
+    """UPnP error returned as SOAP fault."""
+
+    def __init__(self, code, description):
+        """Init error."""
+        super().__init__(description)
+        self.code = code
+        self.description = description
+
+
+class FritzBoxSimulator:
+    """Simulated FRITZ!Box.
+
+    `latency` (seconds, plus up to `jitter` seconds) is added to every SOAP and web request,
+    the number of port mappings, deflections, access profiles, WLAN configurations and hosts
+    is configurable. `calls` counts the SOAP requests per (service, action), the web
+    requests per ("web", page) and the host list downloads as ("web", "devicehostlist.lua").
+    The call monitor is served on `call_monitor_port` if it is not None.
+    """
+
+    serial_number = "989BCB000001"
+    software_version = "154.07.29"
+    model_name = "FRITZ!Box 7590"
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        web_port=None,
+        username="admin",
+        password="secret",
+        latency=0.0,
+        jitter=0.0,
+        port_mappings=10,
+        deflections=3,
+        profiles=2,
+        wlan_configurations=3,
+        hosts=20,
+        ha_ip="127.0.0.1",
+        nonce_lifetime=300.0,
+        call_monitor_port=None,
+        port_mapping_listing=False,
+    ):
+        """Init simulator. Port 0 picks free ports."""
+        self.host = host
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.nonce_lifetime = nonce_lifetime
+
+        self.calls = Counter()
+        self.connections = 0
+        self.lock = threading.RLock()
+
+        self.services = dict(SERVICES)
+        if port_mapping_listing:
+            service_type, description, actions = self.services["WANPPPConnection1"]
+            self.services["WANPPPConnection1"] = (
+                service_type,
+                description,
+                {**actions, "GetListOfPortMappings": LIST_OF_PORT_MAPPINGS},
+            )
+        for num in range(1, wlan_configurations + 1):
+            self.services[f"WLANConfiguration{num}"] = (
+                f"urn:dslforum-org:service:WLANConfiguration:{num}",
+                "tr64desc.xml",
+                WLAN_ACTIONS,
+            )
+        self.service_types = {
+            service_type: name
+            for name, (service_type, _, _) in self.services.items()
+        }
+
+        self.wlans = {num: True for num in range(1, wlan_configurations + 1)}
+        self.port_mappings = [
+            {
+                "NewRemoteHost": "0.0.0.0",
+                "NewExternalPort": 10000 + idx,
+                "NewProtocol": "TCP" if idx % 2 == 0 else "UDP",
+                "NewInternalPort": 8000 + idx,
+                # every other forward belongs to the device running Home Assistant
+                "NewInternalClient": ha_ip if idx % 2 == 0 else f"192.168.178.{100 + idx % 100}",
+                "NewEnabled": idx % 3 != 0,
+                "NewPortMappingDescription": f"Forward {idx}",
+                "NewLeaseDuration": 0,
+            }
+            for idx in range(port_mappings)
+        ]
+        self.deflections = [
+            {
+                "DeflectionId": str(idx),
+                "Enable": _bool(idx % 2 == 0),
+                "Type": "fromNumber",
+                "Number": f"0301234{idx:04d}",
+                "DeflectionToNumber": f"0171234{idx:04d}",
+                "Mode": "eImmediately",
+                "Outgoing": "",
+                "PhonebookID": "",
+            }
+            for idx in range(deflections)
+        ]
+        self.profiles = {
+            f"Profile {idx}": {"id": f"filtprof{idx}", "state": "unlimited"}
+            for idx in range(1, profiles + 1)
+        }
+        self.hosts = [
+            {
+                "IPAddress": f"192.168.178.{20 + idx % 200}",
+                "AddressSource": "DHCP",
+                "LeaseTimeRemaining": "864000",
+                "MACAddress": f"02:00:00:00:{idx // 256:02X}:{idx % 256:02X}",
+                "InterfaceType": "802.11" if idx % 2 else "Ethernet",
+                "Active": _bool(idx % 3 != 0),
+                "HostName": f"host-{idx}",
+            }
+            for idx in range(hosts)
+        ]
+        self.host_change_counter = 1
+        self._host_list_token = hashlib.md5(str(random.random()).encode()).hexdigest()[:16]
+        self.connection_status = "Connected"
+        self.link_status = "Up"
+        self.external_ip = "203.0.113.7"
+        self.connected_since = time.time()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._traffic_time = time.monotonic()
+
+        self._nonce = None
+        self._nonce_created = 0
+        self._sids = set()
+        self._challenge = "1234567z"
+        self.subscriptions = {}  # sid -> service name, callback url and event sequence
+        self.event_paths = {
+            f"/upnp/event/{name.lower()}": name for name in self.services
+        }
+
+        self._servers = [self._create_server(port)]
+        if web_port is not None:
+            self._servers.append(self._create_server(web_port))
+        self.call_monitor_clients = []
+        self._call_monitor_server = None
+        if call_monitor_port is not None:
+            self._call_monitor_server = self._create_call_monitor_server(call_monitor_port)
+        self._threads = []
+
+    @property
+    def port(self):
+        """Return the TR-064 port."""
+        return self._servers[0].server_address[1]
+
+    @property
+    def web_port(self):
+        """Return the port of the web interface."""
+        return self._servers[-1].server_address[1]
+
+    @property
+    def call_monitor_port(self):
+        """Return the port of the call monitor."""
+        return self._call_monitor_server.server_address[1]
+
+    def _all_servers(self):
+        if self._call_monitor_server is None:
+            return self._servers
+        return [*self._servers, self._call_monitor_server]
+
+    def start(self):
+        """Start serving in background threads."""
+        for server in self._all_servers():
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        self.drop_call_monitor_clients()
+        for server in self._all_servers():
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        """Start simulator."""
+        return self.start()
+
+    def __exit__(self, *args):
+        """Stop simulator."""
+        self.stop()
+
+    def reset_calls(self):
+        """Reset call and connection counters."""
+        with self.lock:
+            self.calls.clear()
+            self.connections = 0
+
+    def _create_server(self, port):
+        simulator = self
+
+        class Handler(FritzBoxRequestHandler):
+            pass
+
+        Handler.simulator = simulator
+        server = ThreadingHTTPServer((self.host, port), Handler)
+        server.daemon_threads = True
+        return server
+
+    def delay(self):
+        """Sleep for the configured latency."""
+        latency = self.latency + random.uniform(0, self.jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    # -------------------------------------------
+    # descriptions
+    # -------------------------------------------
+
+    def description(self, file_name):
+        """Return tr64desc.xml or igddesc.xml."""
+        services = "".join(
+            f"<service><serviceType>{service_type}</serviceType>"
+            f"<serviceId>urn:{name}-com:serviceId:{name}</serviceId>"
+            f"<controlURL>/upnp/control/{name.lower()}</controlURL>"
+            f"<eventSubURL>/upnp/event/{name.lower()}</eventSubURL>"
+            f"<SCPDURL>/{name}SCPD.xml</SCPDURL></service>"
+            for name, (service_type, description, _) in self.services.items()
+            if description == file_name
+        )
+        return (
+            '<?xml version="1.0"?>'
+            '<root xmlns="urn:dslforum-org:device-1-0">'
+            "<specVersion><major>1</major><minor>0</minor></specVersion>"
+            "<systemVersion><HW>226</HW><Major>154</Major><Minor>7</Minor><Patch>29</Patch>"
+            "<Buildnumber>100000</Buildnumber><Display>154.07.29</Display></systemVersion>"
+            "<device><deviceType>urn:dslforum-org:device:InternetGatewayDevice:1</deviceType>"
+            f"<friendlyName>{self.model_name}</friendlyName><manufacturer>AVM</manufacturer>"
+            f"<modelName>{self.model_name}</modelName><UDN>uuid:75802409-bccb-40e7-8e6c-{self.serial_number}</UDN>"
+            f"<serviceList>{services}</serviceList><deviceList></deviceList></device></root>"
+        )
+
+    def scpd(self, service_name):
+        """Return the scpd file of a service."""
+        _, _, actions = self.services[service_name]
+        state_variables = {}
+        action_list = []
+        for action_name, (in_arguments, out_arguments) in actions.items():
+            arguments = []
+            for direction, action_arguments in (("in", in_arguments), ("out", out_arguments)):
+                for name, data_type in action_arguments:
+                    state_variables[f"Var{name}"] = data_type
+                    arguments.append(
+                        f"<argument><name>{name}</name><direction>{direction}</direction>"
+                        f"<relatedStateVariable>Var{name}</relatedStateVariable></argument>"
+                    )
+            action_list.append(
+                f"<action><name>{action_name}</name>"
+                f"<argumentList>{''.join(arguments)}</argumentList></action>"
+            )
+        state_table = "".join(
+            f'<stateVariable sendEvents="no"><name>{name}</name><dataType>{data_type}</dataType></stateVariable>'
+            for name, data_type in state_variables.items()
+        )
+        return (
+            '<?xml version="1.0"?>'
+            '<scpd xmlns="urn:dslforum-org:service-1-0">'
+            "<specVersion><major>1</major><minor>0</minor></specVersion>"
+            f"<actionList>{''.join(action_list)}</actionList>"
+            f"<serviceStateTable>{state_table}</serviceStateTable></scpd>"
+        )
+
+    # -------------------------------------------
+    # digest authentication
+    # -------------------------------------------
+
+    def nonce(self):
+        """Return the current nonce, rotated after `nonce_lifetime` seconds."""
+        with self.lock:
+            if self._nonce is None or time.time() - self._nonce_created > self.nonce_lifetime:
+                self._nonce = hashlib.md5(str(random.random()).encode()).hexdigest()[:16].upper()
+                self._nonce_created = time.time()
+            return self._nonce
+
+    def check_digest(self, method, authorization):
+        """Return None if the authorization is valid, otherwise "stale" or "invalid"."""
+        if not authorization or not authorization.startswith("Digest"):
+            return "invalid"
+        params = {
+            key: quoted or unquoted
+            for key, quoted, unquoted in re.findall(
+                r'(\w+)=(?:"([^"]*)"|([^\s,]*))', authorization
+            )
+        }
+        if params.get("username") != self.username:
+            return "invalid"
+        ha1 = _md5(f"{self.username}:{REALM}:{self.password}")
+        ha2 = _md5(f"{method}:{params.get('uri', '')}")
+        if params.get("qop"):
+            expected = _md5(
+                f"{ha1}:{params.get('nonce')}:{params.get('nc')}:{params.get('cnonce')}:{params['qop']}:{ha2}"
+            )
+        else:
+            expected = _md5(f"{ha1}:{params.get('nonce')}:{ha2}")
+        if expected != params.get("response"):
+            return "invalid"
+        if params.get("nonce") != self.nonce():
+            return "stale"
+        return None
+
+    # -------------------------------------------
+    # SOAP actions
+    # -------------------------------------------
+
+    def call(self, service_name, action_name, arguments):
+        """Execute an action, return the out arguments as strings."""
+        with self.lock:
+            self.calls[(service_name, action_name)] += 1
+            if service_name.startswith("WLANConfiguration"):
+                handler = getattr(self, f"wlan_{action_name}")
+                return handler(int(service_name[len("WLANConfiguration"):]), arguments)
+            handler = getattr(self, f"action_{action_name.replace('-', '_')}", None)
+            if handler is None:
+                raise SoapError(401, "Invalid Action")
+            return handler(arguments)
+
+    def wlan_GetInfo(self, num, arguments):
+        return {
+            "NewEnable": _bool(self.wlans[num]),
+            "NewStatus": "Up" if self.wlans[num] else "Disabled",
+            "NewSSID": f"FRITZ!Box 7590 {num}",
+            "NewChannel": "6",
+            "NewStandard": "ax",
+        }
+
+    def wlan_SetEnable(self, num, arguments):
+        self.wlans[num] = arguments["NewEnable"] == "1"
+        self.notify(f"WLANConfiguration{num}")
+        return {}
+
+    def action_GetInfo(self, arguments):
+        return {
+            "NewManufacturerName": "AVM",
+            "NewModelName": self.model_name,
+            "NewDescription": f"{self.model_name} 154.07.29",
+            "NewProductClass": "AVMFB",
+            "NewSerialNumber": self.serial_number,
+            "NewSoftwareVersion": self.software_version,
+            "NewHardwareVersion": self.model_name,
+            "NewSpecVersion": "1.0",
+            "NewProvisioningCode": "",
+            "NewUpTime": str(int(time.time() - self.connected_since)),
+            "NewDeviceLog": "",
+        }
+
+    def action_Reboot(self, arguments):
+        self.connected_since = time.time()
+        return {}
+
+    def action_GetDefaultConnectionService(self, arguments):
+        return {"NewDefaultConnectionService": "1.WANPPPConnection.1"}
+
+    def action_GetPortMappingNumberOfEntries(self, arguments):
+        return {"NewPortMappingNumberOfEntries": str(len(self.port_mappings))}
+
+    def _port_mapping_response(self, port_mapping):
+        return {
+            name: _bool(value) if isinstance(value, bool) else str(value)
+            for name, value in port_mapping.items()
+        }
+
+    def action_GetGenericPortMappingEntry(self, arguments):
+        idx = int(arguments["NewPortMappingIndex"])
+        if idx >= len(self.port_mappings):
+            raise SoapError(713, "SpecifiedArrayIndexInvalid")
+        return self._port_mapping_response(self.port_mappings[idx])
+
+    def action_GetListOfPortMappings(self, arguments):
+        start = int(arguments.get("NewStartPort") or 0)
+        end = int(arguments.get("NewEndPort") or 65535)
+        number = int(arguments.get("NewNumberOfPorts") or 0)
+        port_mappings = [
+            port_mapping
+            for port_mapping in self.port_mappings
+            if port_mapping["NewProtocol"] == arguments.get("NewProtocol")
+            and start <= port_mapping["NewExternalPort"] <= end
+        ]
+        if number:
+            port_mappings = port_mappings[:number]
+        if not port_mappings:
+            raise SoapError(714, "NoSuchEntryInArray")
+        fields = {
+            "NewRemoteHost": "NewRemoteHost",
+            "NewExternalPort": "NewExternalPort",
+            "NewProtocol": "NewProtocol",
+            "NewInternalPort": "NewInternalPort",
+            "NewInternalClient": "NewInternalClient",
+            "NewEnabled": "NewEnabled",
+            "NewDescription": "NewPortMappingDescription",
+            "NewLeaseTime": "NewLeaseDuration",
+        }
+        entries = "".join(
+            "<p:PortMappingEntry>"
+            + "".join(
+                f"<p:{field}>{escape(self._port_mapping_response(port_mapping)[name])}</p:{field}>"
+                for field, name in fields.items()
+            )
+            + "</p:PortMappingEntry>"
+            for port_mapping in port_mappings
+        )
+        return {
+            "NewPortListing": '<?xml version="1.0" encoding="UTF-8"?>'
+            '<p:PortMappingList xmlns:p="urn:schemas-upnp-org:gw:WANIPConnection">'
+            f"{entries}</p:PortMappingList>"
+        }
+
+    def _find_port_mapping(self, arguments):
+        for port_mapping in self.port_mappings:
+            if (
+                str(port_mapping["NewExternalPort"]) == arguments["NewExternalPort"]
+                and port_mapping["NewProtocol"] == arguments["NewProtocol"]
+            ):
+                return port_mapping
+        return None
+
+    def action_GetSpecificPortMappingEntry(self, arguments):
+        port_mapping = self._find_port_mapping(arguments)
+        if port_mapping is None:
+            raise SoapError(714, "NoSuchEntryInArray")
+        response = self._port_mapping_response(port_mapping)
+        return {name: response[name] for name, _ in PORT_MAPPING_ARGUMENTS[3:]}
+
+    def action_AddPortMapping(self, arguments):
+        port_mapping = self._find_port_mapping(arguments)
+        if port_mapping is None:
+            port_mapping = {}
+            self.port_mappings.append(port_mapping)
+        for name, data_type in PORT_MAPPING_ARGUMENTS:
+            value = arguments.get(name, "")
+            if data_type == "boolean":
+                value = value == "1"
+            elif data_type.startswith("ui"):
+                value = int(value)
+            port_mapping[name] = value
+        return {}
+
+    def action_GetHostNumberOfEntries(self, arguments):
+        return {"NewHostNumberOfEntries": str(len(self.hosts))}
+
+    def action_GetGenericHostEntry(self, arguments):
+        idx = int(arguments["NewIndex"])
+        if idx >= len(self.hosts):
+            raise SoapError(713, "SpecifiedArrayIndexInvalid")
+        return {f"New{name}": value for name, value in self.hosts[idx].items()}
+
+    def action_X_AVM_DE_GetHostListPath(self, arguments):
+        return {"NewX_AVM-DE_HostListPath": f"{HOST_LIST_PATH}?sid={self._host_list_token}"}
+
+    def action_X_AVM_DE_GetChangeCounter(self, arguments):
+        return {"NewX_AVM-DE_GetChangeCounter": str(self.host_change_counter)}
+
+    def set_host_active(self, idx, active):
+        """Connect or disconnect a host, which increments the change counter of the host list."""
+        with self.lock:
+            self.hosts[idx]["Active"] = _bool(active)
+            self.host_change_counter += 1
+
+    def host_list(self, query):
+        """Return the xml host list or None on an invalid token."""
+        if query.get("sid", [None])[0] != self._host_list_token:
+            return None
+        with self.lock:
+            self.calls[("web", HOST_LIST_PATH[1:])] += 1
+            items = "".join(
+                f"<Item><Index>{idx + 1}</Index>"
+                + "".join(f"<{name}>{escape(value)}</{name}>" for name, value in host.items())
+                + "</Item>"
+                for idx, host in enumerate(self.hosts)
+            )
+        return f'<?xml version="1.0" encoding="utf-8"?><List>{items}</List>'
+
+    def action_GetNumberOfDeflections(self, arguments):
+        return {"NewNumberOfDeflections": str(len(self.deflections))}
+
+    def action_GetDeflections(self, arguments):
+        items = "".join(
+            "<Item>"
+            + "".join(f"<{name}>{escape(value)}</{name}>" for name, value in deflection.items())
+            + "</Item>"
+            for deflection in self.deflections
+        )
+        return {"NewDeflectionList": f"<List>{items}</List>"}
+
+    def action_SetDeflectionEnable(self, arguments):
+        idx = int(arguments["NewDeflectionId"])
+        if idx >= len(self.deflections):
+            raise SoapError(713, "SpecifiedArrayIndexInvalid")
+        self.deflections[idx]["Enable"] = arguments["NewEnable"]
+        return {}
+
+    def action_GetCommonLinkProperties(self, arguments):
+        return {
+            "NewWANAccessType": "DSL",
+            "NewLayer1UpstreamMaxBitRate": "40000000",
+            "NewLayer1DownstreamMaxBitRate": "250000000",
+            "NewPhysicalLinkStatus": self.link_status,
+        }
+
+    def action_GetStatusInfo(self, arguments):
+        return {
+            "NewConnectionStatus": self.connection_status,
+            "NewLastConnectionError": "ERROR_NONE",
+            "NewUptime": str(int(time.time() - self.connected_since)),
+        }
+
+    def action_GetExternalIPAddress(self, arguments):
+        return {"NewExternalIPAddress": self.external_ip}
+
+    def action_X_AVM_DE_GetExternalIPv6Address(self, arguments):
+        return {
+            "NewExternalIPv6Address": "2001:db8::1",
+            "NewPrefixLength": "64",
+            "NewValidLifetime": "7200",
+            "NewPreferedLifetime": "3600",
+        }
+
+    def action_ForceTermination(self, arguments):
+        self.connected_since = time.time()
+        self.external_ip = f"203.0.113.{random.randint(1, 254)}"
+        self.notify("WANIPConn1")
+        return {}
+
+    def action_GetAddonInfos(self, arguments):
+        # the counters grow with random rates (bytes/s) since the last call
+        now = time.monotonic()
+        elapsed, self._traffic_time = now - self._traffic_time, now
+        send_rate = random.randint(10_000, 5_000_000)
+        receive_rate = random.randint(100_000, 30_000_000)
+        self.bytes_sent += int(send_rate * elapsed)
+        self.bytes_received += int(receive_rate * elapsed)
+        return {
+            "NewByteSendRate": str(send_rate),
+            "NewByteReceiveRate": str(receive_rate),
+            "NewPacketSendRate": str(send_rate // 1400),
+            "NewPacketReceiveRate": str(receive_rate // 1400),
+            "NewTotalBytesSent": str(self.bytes_sent % 2 ** 32),
+            "NewTotalBytesReceived": str(self.bytes_received % 2 ** 32),
+            "NewX_AVM_DE_TotalBytesSent64": str(self.bytes_sent),
+            "NewX_AVM_DE_TotalBytesReceived64": str(self.bytes_received),
+        }
+
+    # -------------------------------------------
+    # events (GENA)
+    # -------------------------------------------
+
+    def evented_variables(self, service_name):
+        """Return the current values of the evented state variables of a service."""
+        if service_name == "WANIPConn1":
+            return {
+                "ConnectionStatus": self.connection_status,
+                "ExternalIPAddress": self.external_ip,
+            }
+        if service_name == "WANCommonIFC1":
+            return {"PhysicalLinkStatus": self.link_status}
+        if service_name.startswith("WLANConfiguration"):
+            num = int(service_name[len("WLANConfiguration"):])
+            return {
+                "Enable": _bool(self.wlans[num]),
+                "Status": "Up" if self.wlans[num] else "Disabled",
+            }
+        return {}
+
+    def subscribe(self, service_name, callback=None, sid=None):
+        """Add a subscription or renew the subscription `sid`, return the sid or None if unknown."""
+        with self.lock:
+            self.calls[("gena", "SUBSCRIBE")] += 1
+            if sid is not None:
+                return sid if sid in self.subscriptions else None
+            sid = f"uuid:{hashlib.md5(str(random.random()).encode()).hexdigest()}"
+            self.subscriptions[sid] = {"service": service_name, "callback": callback, "seq": 0}
+        # initial event with all evented variables
+        self.notify(service_name, sids=[sid])
+        return sid
+
+    def unsubscribe(self, sid):
+        """Remove a subscription, return False if unknown."""
+        with self.lock:
+            self.calls[("gena", "UNSUBSCRIBE")] += 1
+            return self.subscriptions.pop(sid, None) is not None
+
+    def notify(self, service_name, variables=None, sids=None):
+        """Send the (given or all) evented variables of a service to its subscribers in the background."""
+        with self.lock:
+            if variables is None:
+                variables = self.evented_variables(service_name)
+            if not variables:
+                return
+            events = []
+            for sid, subscription in self.subscriptions.items():
+                if subscription["service"] == service_name and (sids is None or sid in sids):
+                    events.append((sid, subscription["callback"], subscription["seq"]))
+                    subscription["seq"] += 1
+        body = (
+            '<?xml version="1.0"?><e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0">'
+            + "".join(
+                f"<e:property><{name}>{escape(value)}</{name}></e:property>"
+                for name, value in variables.items()
+            )
+            + "</e:propertyset>"
+        )
+        for event in events:
+            threading.Thread(target=self._send_event, args=(*event, body), daemon=True).start()
+
+    def _send_event(self, sid, callback, seq, body):
+        url = urlparse(callback)
+        connection = HTTPConnection(url.hostname, url.port, timeout=5)
+        try:
+            connection.request(
+                "NOTIFY",
+                url.path,
+                body.encode("utf-8"),
+                {
+                    "Content-Type": 'text/xml; charset="utf-8"',
+                    "NT": "upnp:event",
+                    "NTS": "upnp:propchange",
+                    "SID": sid,
+                    "SEQ": str(seq),
+                },
+            )
+            connection.getresponse().read()
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+    def set_connection(self, connected=True, link_up=True):
+        """Change the internet connection and send the events."""
+        with self.lock:
+            if connected and self.connection_status != "Connected":
+                self.connected_since = time.time()
+            self.connection_status = "Connected" if connected else "Disconnected"
+            self.link_status = "Up" if link_up else "Down"
+        self.notify("WANIPConn1")
+        self.notify("WANCommonIFC1")
+
+    # -------------------------------------------
+    # web interface (access profiles)
+    # -------------------------------------------
+
+    def _create_call_monitor_server(self, port):
+        simulator = self
+
+        class Handler(CallMonitorRequestHandler):
+            pass
+
+        Handler.simulator = simulator
+        server = ThreadingTCPServer((self.host, port), Handler, bind_and_activate=False)
+        server.allow_reuse_address = True
+        server.daemon_threads = True
+        server.server_bind()
+        server.server_activate()
+        return server
+
+    def send_call_event(self, event_type, connection_id, *fields):
+        """Send a call monitor line (RING, CALL, CONNECT or DISCONNECT) to all clients.
+
+        The fields follow the connection id as sent by the box, e.g.
+        ``send_call_event("RING", 0, "0301234567", "987654", "SIP0")``.
+        """
+        date = time.strftime("%d.%m.%y %H:%M:%S")
+        line = ";".join([date, event_type, str(connection_id), *map(str, fields)]) + ";\r\n"
+        with self.lock:
+            clients = list(self.call_monitor_clients)
+        for client in clients:
+            try:
+                client.sendall(line.encode("utf-8"))
+            except OSError:
+                pass
+        return len(clients)
+
+    def simulate_call(self, caller="0301234567", callee="987654", duration=5, connection_id=0):
+        """Send the events of an incoming call which is answered and hung up after `duration` seconds."""
+        self.send_call_event("RING", connection_id, caller, callee, "SIP0")
+        self.send_call_event("CONNECT", connection_id, 10, caller)
+        self.send_call_event("DISCONNECT", connection_id, duration)
+
+    def drop_call_monitor_clients(self):
+        """Close the connections of all call monitor clients, like a restarting box."""
+        with self.lock:
+            clients = list(self.call_monitor_clients)
+            self.call_monitor_clients.clear()
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
+
+    def login(self, query):
+        """Return the SessionInfo xml of login_sid.lua."""
+        sid = EMPTY_SID
+        with self.lock:
+            self.calls[("web", "login_sid.lua")] += 1
+        response = query.get("response", [None])[0]
+        if response:
+            md5 = hashlib.md5(
+                f"{self._challenge}-{self.password}".encode("utf-16le")
+            ).hexdigest()
+            if (
+                query.get("username", [None])[0] == self.username
+                and response == f"{self._challenge}-{md5}"
+            ):
+                sid = hashlib.md5(str(random.random()).encode()).hexdigest()[:16]
+                with self.lock:
+                    self._sids.add(sid)
+        return (
+            '<?xml version="1.0" encoding="utf-8"?><SessionInfo>'
+            f"<SID>{sid}</SID><Challenge>{self._challenge}</Challenge>"
+            "<BlockTime>0</BlockTime></SessionInfo>"
+        )
+
+    def data(self, form):
+        """Return the page requested from data.lua or None on an invalid sid."""
+        if form.get("sid") not in self._sids:
+            return None
+        page = form.get("page")
+        with self.lock:
+            self.calls[("web", page)] += 1
+            if page == "kidPro":
+                return self.profile_list_page()
+            if page == "kids_profileedit":
+                profile = self._profile_by_id(form.get("edit"))
+                if profile is None:
+                    return None
+                if "apply" in form:
+                    profile["state"] = form.get("time")
+                return self.profile_edit_page(profile)
+        return "<html></html>"
+
+    def _profile_by_id(self, profile_id):
+        for profile in self.profiles.values():
+            if profile["id"] == profile_id:
+                return profile
+        return None
+
+    def profile_list_page(self):
+        """Return the access profile overview with the online time of every profile."""
+        rows = "".join(
+            f'<tr><td class="name"><span>{escape(name)}</span></td>'
+            f'<td class="time">{PROFILE_OVERVIEW_STATES[profile["state"]]}</td>'
+            f'<td class="btncolumn"><button type="submit" name="edit" value="{profile["id"]}"></button></td></tr>'
+            for name, profile in self.profiles.items()
+        )
+        return f'<html><body><table id="uiProfileList">{rows}</table></body></html>'
+
+    def profile_edit_page(self, profile):
+        """Return the edit page of a profile."""
+        inputs = "".join(
+            f'<input type="radio" name="time" value="{state}"'
+            + (' checked="checked"' if profile["state"] == state else "")
+            + ">"
+            for state in ("unlimited", "never", "limited")
+        )
+        return f'<html><body><div class="time_ctrl_options">{inputs}</div></body></html>'
+
+
+class CallMonitorRequestHandler(BaseRequestHandler):
+    """Keep a call monitor client registered until it disconnects."""
+
+    simulator = None
+
+    def handle(self):
+        """Register the client and wait for it to close the connection."""
+        with self.simulator.lock:
+            self.simulator.call_monitor_clients.append(self.request)
+        try:
+            while self.request.recv(1024):
+                pass
+        except OSError:
+            pass
+        finally:
+            with self.simulator.lock:
+                if self.request in self.simulator.call_monitor_clients:
+                    self.simulator.call_monitor_clients.remove(self.request)
+
+
+class FritzBoxRequestHandler(BaseHTTPRequestHandler):
+    """Request handler of the simulator."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    simulator = None
+
+    def setup(self):
+        """Count connections."""
+        super().setup()
+        with self.simulator.lock:
+            self.simulator.connections += 1
+
+    def log_message(self, format, *args):
+        """Do not log requests."""
+
+    def _send(self, status, body, content_type="text/xml", headers=None):
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self):
+        """Serve descriptions and login_sid.lua."""
+        url = urlparse(self.path)
+        simulator = self.simulator
+        if url.path in ("/tr64desc.xml", "/igddesc.xml"):
+            self._send(200, simulator.description(url.path[1:]))
+        elif url.path.endswith("SCPD.xml") and url.path[1:-8] in simulator.services:
+            self._send(200, simulator.scpd(url.path[1:-8]))
+        elif url.path == "/login_sid.lua":
+            simulator.delay()
+            self._send(200, simulator.login(parse_qs(url.query)))
+        elif url.path == HOST_LIST_PATH:
+            simulator.delay()
+            host_list = simulator.host_list(parse_qs(url.query))
+            if host_list is None:
+                self._send(403, "<html>Forbidden</html>", "text/html")
+            else:
+                self._send(200, host_list)
+        else:
+            self._send(404, "<html>Not found</html>", "text/html")
+
+    def do_SUBSCRIBE(self):
+        """Subscribe to the events of a service or renew a subscription."""
+        self._read_body()
+        service_name = self.simulator.event_paths.get(self.path)
+        callback = self.headers.get("CALLBACK", "").strip("<>")
+        if service_name is None or not (callback or self.headers.get("SID")):
+            self._send(412, "")
+            return
+        sid = self.simulator.subscribe(service_name, callback or None, self.headers.get("SID"))
+        if sid is None:
+            self._send(412, "")
+            return
+        self._send(200, "", headers={"SID": sid, "TIMEOUT": "Second-1800"})
+
+    def do_UNSUBSCRIBE(self):
+        """Cancel a subscription."""
+        self._read_body()
+        self._send(200 if self.simulator.unsubscribe(self.headers.get("SID")) else 412, "")
+
+    def do_POST(self):
+        """Serve SOAP actions and data.lua."""
+        body = self._read_body()
+        if self.path == "/data.lua":
+            self.simulator.delay()
+            form = {
+                key: values[0]
+                for key, values in parse_qs(body.decode(), keep_blank_values=True).items()
+            }
+            page = self.simulator.data(form)
+            if page is None:
+                self._send(403, "<html>Forbidden</html>", "text/html")
+            else:
+                self._send(200, page, "text/html")
+            return
+        self._soap(body)
+
+    def _soap(self, body):
+        simulator = self.simulator
+        result = simulator.check_digest("POST", self.headers.get("Authorization"))
+        if result is not None:
+            challenge = f'Digest realm="{REALM}", nonce="{simulator.nonce()}", algorithm=MD5, qop="auth"'
+            if result == "stale":
+                challenge += ", stale=true"
+            self._send(
+                401,
+                "<html>401 Unauthorized</html>",
+                "text/html",
+                {"WWW-Authenticate": challenge},
+            )
+            return
+
+        simulator.delay()
+        service_type, _, action_name = self.headers.get("soapaction", "").strip('"').partition("#")
+        service_name = simulator.service_types.get(service_type)
+        root = etree.fromstring(body)
+        action_node = root.find(f".//{{{service_type}}}{action_name}")
+        arguments = {}
+        if action_node is not None:
+            arguments = {node.tag: node.text or "" for node in action_node}
+        try:
+            if service_name is None:
+                raise SoapError(401, "Invalid Action")
+            response = simulator.call(service_name, action_name, arguments)
+        except SoapError as err:
+            self._send(
+                500,
+                f'<?xml version="1.0"?><s:Envelope xmlns:s="{SOAP_NS}"><s:Body><s:Fault>'
+                "<faultcode>s:Client</faultcode><faultstring>UPnPError</faultstring><detail>"
+                '<UPnPError xmlns="urn:schemas-upnp-org:control-1-0">'
+                f"<errorCode>{err.code}</errorCode><errorDescription>{err.description}</errorDescription>"
+                "</UPnPError></detail></s:Fault></s:Body></s:Envelope>",
+            )
+            return
+
+        arguments = "".join(
+            f"<{name}>{escape(value)}</{name}>" for name, value in response.items()
+        )
+        self._send(
+            200,
+            f'<?xml version="1.0"?><s:Envelope xmlns:s="{SOAP_NS}" '
+            's:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/"><s:Body>'
+            f'<u:{action_name}Response xmlns:u="{service_type}">{arguments}'
+            f"</u:{action_name}Response></s:Body></s:Envelope>",
+        )
+
+
+def main():
+    """Run the simulator until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=49000)
+    parser.add_argument("--web-port", type=int, default=8080)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="additional random seconds")
+    parser.add_argument("--port-mappings", type=int, default=10)
+    parser.add_argument("--deflections", type=int, default=3)
+    parser.add_argument("--profiles", type=int, default=2)
+    parser.add_argument("--wlan-configurations", type=int, default=3, choices=(2, 3, 4))
+    parser.add_argument("--hosts", type=int, default=20)
+    parser.add_argument(
+        "--port-mapping-listing", action="store_true", help="offer GetListOfPortMappings (IGD 2)"
+    )
+    parser.add_argument("--ha-ip", default="127.0.0.1")
+    parser.add_argument(
+        "--call-monitor-port", type=int, default=None, help="serve the call monitor, 1012 needs root"
+    )
+    args = parser.parse_args()
+
+    simulator = FritzBoxSimulator(
+        host=args.host,
+        port=args.port,
+        web_port=args.web_port,
+        username=args.username,
+        password=args.password,
+        latency=args.latency,
+        jitter=args.jitter,
+        port_mappings=args.port_mappings,
+        deflections=args.deflections,
+        profiles=args.profiles,
+        wlan_configurations=args.wlan_configurations,
+        hosts=args.hosts,
+        ha_ip=args.ha_ip,
+        call_monitor_port=args.call_monitor_port,
+        port_mapping_listing=args.port_mapping_listing,
+    )
+    simulator.start()
+    print(f"FRITZ!Box simulator on http://{args.host}:{simulator.port} (web {simulator.web_port})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
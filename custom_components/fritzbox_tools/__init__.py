@@ -1,38 +1,58 @@
 """Support for AVM Fritz!Box functions."""
+import asyncio
 import logging
 
 from homeassistant.config_entries import SOURCE_IMPORT, SOURCE_REAUTH, ConfigEntry
 from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    ATTR_STATE,
     CONF_DEVICES,
     CONF_HOST,
     CONF_PASSWORD,
     CONF_PORT,
     CONF_USERNAME,
 )
+from homeassistant.helpers.storage import STORAGE_DIR
 from homeassistant.helpers.typing import ConfigType, HomeAssistantType
 
-from .common import SERVICE_SCHEMA, FritzBoxTools
+from .common import APPLY_SCHEMA, SERVICE_SCHEMA, FritzBoxTools
 from .const import (
     ATTR_HOST,
+    ATTR_TARGETS,
+    ATTR_TIMEOUT,
+    CONF_MAX_CONCURRENT_REQUESTS,
     CONF_PROFILES,
+    CONF_REQUEST_TIMEOUT,
+    CONF_USE_CALL_MONITOR,
     CONF_USE_DEFLECTIONS,
+    CONF_USE_HOSTS,
     CONF_USE_PORT,
     CONF_USE_PROFILES,
     CONF_USE_WIFI,
+    DATA_FRITZ_TOOLS_INDEX,
     DATA_FRITZ_TOOLS_INSTANCE,
     DEFAULT_HOST,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
     DEFAULT_PORT,
     DEFAULT_PROFILES,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_USE_CALL_MONITOR,
     DEFAULT_USE_DEFLECTIONS,
+    DEFAULT_USE_HOSTS,
     DEFAULT_USE_PORT,
     DEFAULT_USE_PROFILES,
     DEFAULT_USE_WIFI,
     DOMAIN,
     ERROR_CONNECTION_ERROR,
+    EVENT_CALL_STATISTICS,
+    HOST_ALL,
+    SERVICE_APPLY,
+    SERVICE_CALL_STATISTICS,
     SERVICE_REBOOT,
     SERVICE_RECONNECT,
     SUPPORTED_DOMAINS,
 )
+from .executor import get_executor, shutdown_executor
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -73,8 +93,17 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool
     use_wifi = entry.data.get(CONF_USE_WIFI, DEFAULT_USE_WIFI)
     use_port = entry.data.get(CONF_USE_PORT, DEFAULT_USE_PORT)
     use_deflections = entry.data.get(CONF_USE_DEFLECTIONS, DEFAULT_USE_DEFLECTIONS)
+    use_hosts = entry.data.get(CONF_USE_HOSTS, DEFAULT_USE_HOSTS)
+    use_call_monitor = entry.data.get(
+        CONF_USE_CALL_MONITOR, DEFAULT_USE_CALL_MONITOR
+    )
+    max_concurrent_requests = entry.data.get(
+        CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+    )
+    request_timeout = entry.data.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT)
 
-    fritz_tools = await hass.async_add_executor_job(
+    executor = get_executor(hass, host)
+    fritz_tools = await executor.async_run(
         lambda: FritzBoxTools(
             host=host,
             port=port,
@@ -83,12 +112,18 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool
             profile_list=profile_list,
             use_wifi=use_wifi,
             use_deflections=use_deflections,
+            use_hosts=use_hosts,
+            use_call_monitor=use_call_monitor,
             use_port=use_port,
             use_profiles=use_profiles,
+            cache_dir=hass.config.path(STORAGE_DIR, DOMAIN),
+            max_concurrent_requests=max_concurrent_requests,
+            request_timeout=request_timeout,
+            executor=executor,
         )
     )
 
-    success, error = await hass.async_add_executor_job(fritz_tools.is_ok)
+    success, error = fritz_tools.is_ok()
     if not success and error is ERROR_CONNECTION_ERROR:
         _LOGGER.error("Unable to setup FRITZ!Box Tools component.")
         hass.async_create_task(
@@ -100,8 +135,15 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool
         )
         return False
 
-    hass.data.setdefault(DOMAIN, {DATA_FRITZ_TOOLS_INSTANCE: {}, CONF_DEVICES: set()})
+    await fritz_tools.async_setup(hass)
+
+    hass.data.setdefault(
+        DOMAIN,
+        {DATA_FRITZ_TOOLS_INSTANCE: {}, DATA_FRITZ_TOOLS_INDEX: {}, CONF_DEVICES: set()},
+    )
     hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE][entry.entry_id] = fritz_tools
+    for key in (fritz_tools.host, fritz_tools.unique_id):
+        hass.data[DOMAIN][DATA_FRITZ_TOOLS_INDEX][key] = fritz_tools
 
     setup_hass_services(hass)
 
@@ -114,52 +156,183 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool
     return True
 
 
-def setup_hass_services(hass):
-    """Home Assistant services."""
+def get_instances(hass, service, hosts):
+    """Return the instances of the given hosts or serial numbers, of all boxes for "all"."""
+    if HOST_ALL in hosts:
+        return list(hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE].values())
 
-    def reboot(call):
-        """Reboot fritzbox."""
-        host = call.data.get(ATTR_HOST)
-        fritztools = hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE].get(host, None)
+    index = hass.data[DOMAIN][DATA_FRITZ_TOOLS_INDEX]
+    instances = []
+    for host in hosts:
+        fritztools = index.get(host)
         if fritztools is None:
             _LOGGER.error(
-                f"{SERVICE_REBOOT}: Please supply a valid hostname of a configured fritzbox for the service (e.g. 192.168.178.1)"
+                f"{service}: {host} is not configured. Please supply valid hostnames or serial numbers "
+                "of configured fritzboxes for the service (e.g. 192.168.178.1) or all"
             )
-        else:
-            fritztools.service_reboot_fritzbox()
+        elif fritztools not in instances:
+            instances.append(fritztools)
+    return instances
 
-    def reconnect(call):
-        """Reconnect fritzbox."""
-        host = call.data.get(ATTR_HOST)
-        fritztools = hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE].get(host, None)
-        if fritztools is None:
-            _LOGGER.error(
-                f"{SERVICE_RECONNECT}: Please supply a valid hostname of a configured fritzbox for the service (e.g. 192.168.178.1)"
+
+def setup_hass_services(hass):
+    """Home Assistant services."""
+
+    async def async_call_boxes(call, method_name):
+        """Call a service method of all given fritzboxes concurrently, each within the timeout."""
+        instances = get_instances(hass, call.service, call.data[ATTR_HOST])
+        timeout = call.data[ATTR_TIMEOUT]
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(getattr(fritztools, method_name)(), timeout)
+                for fritztools in instances
+            ),
+            return_exceptions=True,
+        )
+        for fritztools, result in zip(instances, results):
+            if isinstance(result, asyncio.TimeoutError):
+                _LOGGER.error(
+                    f"{call.service}: {fritztools.host} did not respond within {timeout} seconds"
+                )
+            elif isinstance(result, Exception):
+                _LOGGER.error(
+                    f"{call.service}: failed for {fritztools.host}", exc_info=result
+                )
+
+    async def async_reboot(call):
+        """Reboot fritzboxes."""
+        await async_call_boxes(call, "async_service_reboot_fritzbox")
+
+    async def async_reconnect(call):
+        """Reconnect fritzboxes."""
+        await async_call_boxes(call, "async_service_reconnect_fritzbox")
+
+    def call_statistics(call):
+        """Log the latency histograms of all calls to the fritzboxes and fire them as events."""
+        for fritztools in get_instances(hass, call.service, call.data[ATTR_HOST]):
+            statistics = fritztools.call_statistics.as_dict()
+            timeouts = fritztools.deadlines.as_dict()
+            for call_name, histogram in statistics.items():
+                histogram["timeout_s"] = timeouts.get(call_name)
+                _LOGGER.info(
+                    f"{fritztools.host} {call_name}: {histogram['count']} calls, {histogram['errors']} errors, "
+                    f"{histogram['timeouts']} timeouts, mean {histogram['mean_ms']}ms, "
+                    f"p95 <= {histogram['p95_ms']}ms, max {histogram['max_ms']}ms, "
+                    f"timeout {histogram['timeout_s']}s"
+                )
+            executor = fritztools.executor.stats
+            _LOGGER.info(
+                f"{fritztools.host} executor: {executor['queued']} queued "
+                f"(max {executor['max_queued']}), {executor['running']} of {executor['workers']} workers busy, "
+                f"{executor['jobs']} jobs, mean wait {executor['mean_wait_ms']}ms, max wait {executor['max_wait_ms']}ms"
             )
-        else:
-            fritztools.service_reconnect_fritzbox()
+            connection = fritztools.connection_stats
+            _LOGGER.info(
+                f"{fritztools.host} connection: {connection['requests']} requests, "
+                f"{connection['connections_created']} connections created, {connection['connections_reused']} reused, "
+                f"{connection['auth_challenges']} auth challenges, {connection['auth_retries']} auth retries"
+            )
+            hass.bus.fire(
+                EVENT_CALL_STATISTICS,
+                {
+                    ATTR_HOST: fritztools.host,
+                    "calls": statistics,
+                    "executor": executor,
+                    "connection": connection,
+                },
+            )
+
+    async def async_apply(call):
+        """Switch many switches of one or more fritzboxes with one refresh per fritzbox at the end."""
+        instances = hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE].values()
+        states = {}  # the last state of a switch wins
+        for target in call.data[ATTR_TARGETS]:
+            entity_id = target[ATTR_ENTITY_ID]
+            switch = next(
+                (
+                    instance.switches[entity_id]
+                    for instance in instances
+                    if entity_id in instance.switches
+                ),
+                None,
+            )
+            if switch is None:
+                _LOGGER.error(
+                    f"{SERVICE_APPLY}: {entity_id} is not a switch of a configured fritzbox"
+                )
+                continue
+            states[switch] = target[ATTR_STATE]
+
+        # only send what changes, all writes share the connection pool and authentication of their box
+        changes = {
+            switch: state for switch, state in states.items() if switch.is_on != state
+        }
+        results = await asyncio.gather(
+            *(switch.async_apply_state(state) for switch, state in changes.items()),
+            return_exceptions=True,
+        )
+
+        # refresh all touched sources, also those of failed writes, which may have been applied anyway
+        sources = {}
+        for switch, result in zip(changes, results):
+            if isinstance(result, Exception):
+                _LOGGER.error(
+                    f"{SERVICE_APPLY}: could not switch {switch.entity_id}", exc_info=result
+                )
+            switch.async_write_ha_state()
+            sources.setdefault(switch.coordinator, set()).add(switch.source_name)
+        await asyncio.gather(
+            *(
+                coordinator.async_invalidate_sources(names)
+                for coordinator, names in sources.items()
+            )
+        )
 
     hass.services.async_register(
         DOMAIN,
         SERVICE_RECONNECT,
-        reconnect,
+        async_reconnect,
+        schema=SERVICE_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY,
+        async_apply,
+        schema=APPLY_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CALL_STATISTICS,
+        call_statistics,
         schema=SERVICE_SCHEMA,
     )
     hass.services.async_register(
         DOMAIN,
         SERVICE_REBOOT,
-        reboot,
+        async_reboot,
         schema=SERVICE_SCHEMA,
     )
 
 
 async def async_unload_entry(hass: HomeAssistantType, entry: ConfigType) -> bool:
     """Unload FRITZ!Box Tools config entry."""
-    hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE].pop(entry.entry_id)
-    hass.services.async_remove(DOMAIN, SERVICE_RECONNECT)
-    hass.services.async_remove(DOMAIN, SERVICE_REBOOT)
+    fritz_tools = hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE].pop(entry.entry_id)
+    index = hass.data[DOMAIN][DATA_FRITZ_TOOLS_INDEX]
+    for key in (fritz_tools.host, fritz_tools.unique_id):
+        if index.get(key) is fritz_tools:
+            del index[key]
+
+    # the services are shared by all boxes
+    if not hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE]:
+        hass.services.async_remove(DOMAIN, SERVICE_RECONNECT)
+        hass.services.async_remove(DOMAIN, SERVICE_REBOOT)
+        hass.services.async_remove(DOMAIN, SERVICE_CALL_STATISTICS)
+        hass.services.async_remove(DOMAIN, SERVICE_APPLY)
 
     for domain in SUPPORTED_DOMAINS:
         await hass.config_entries.async_forward_entry_unload(entry, domain)
 
+    await fritz_tools.async_unload()
+    shutdown_executor(hass, fritz_tools.host)
+
     return True
@@ -17,12 +17,11 @@ except ImportError:
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.typing import HomeAssistantType
 
-from .const import DATA_FRITZ_TOOLS_INSTANCE, DOMAIN
+from .const import DATA_FRITZ_TOOLS_INSTANCE, DOMAIN, SOURCE_CONNECTIVITY
+from .coordinator import FritzBoxCoordinatorEntity
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = datetime.timedelta(seconds=60)
-
 
 async def async_setup_entry(
     hass: HomeAssistantType, entry: ConfigEntry, async_add_entities
@@ -31,14 +30,14 @@ async def async_setup_entry(
     _LOGGER.debug("Setting up sensors")
     fritzbox_tools = hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE][entry.entry_id]
 
-    if "WANIPConn1" in fritzbox_tools.connection.services:
+    if SOURCE_CONNECTIVITY in fritzbox_tools.coordinator.sources:
         """ We do not support repeaters at the moment """
-        async_add_entities([FritzBoxConnectivitySensor(fritzbox_tools)], True)
+        async_add_entities([FritzBoxConnectivitySensor(fritzbox_tools)])
 
     return True
 
 
-class FritzBoxConnectivitySensor(BinarySensorEntity):
+class FritzBoxConnectivitySensor(FritzBoxCoordinatorEntity, BinarySensorEntity):
     """Define Fritzbox connectivity class."""
 
     name = "FRITZ!Box Connectivity"
@@ -48,6 +47,8 @@ class FritzBoxConnectivitySensor(BinarySensorEntity):
     def __init__(self, fritzbox_tools):
         """Init Fritzbox connectivity class."""
         self.fritzbox_tools = fritzbox_tools
+        self.coordinator = fritzbox_tools.coordinator
+        self._source = SOURCE_CONNECTIVITY
         self.entity_id = ENTITY_ID_FORMAT.format(
             f"fritzbox_{self.fritzbox_tools.fritzbox_model}_connectivity"
         )
@@ -83,51 +84,26 @@ class FritzBoxConnectivitySensor(BinarySensorEntity):
         """Return device attributes."""
         return self._attributes
 
-    def _connection_call_action(self):
-        return lambda: self.fritzbox_tools.connection.call_action(
-            "WANCommonInterfaceConfig1", "GetCommonLinkProperties"
-        )["NewPhysicalLinkStatus"]
-
-    async def _async_fetch_update(self):
-        """Fetch updates."""
-        self._is_on = True
-        try:
-            if "WANCommonInterfaceConfig1" in self.fritzbox_tools.connection.services:
-                connection = self._connection_call_action()
-                is_up = await self.hass.async_add_executor_job(connection)
-                self._is_on = is_up == "Up"
-            else:
-                self._is_on = self.hass.async_add_executor_job(
-                    self.fritzbox_tools.fritzstatus.is_connected
-                )
-
-            self._is_available = True
-
-            status = self.fritzbox_tools.fritzstatus
-            uptime_seconds = await self.hass.async_add_executor_job(
-                lambda: getattr(status, "uptime")
-            )
-            last_reconnect = datetime.datetime.now() - datetime.timedelta(
-                seconds=uptime_seconds
-            )
-            self._attributes["last_reconnect"] = last_reconnect.replace(
-                microsecond=0
-            ).isoformat()
-
-            for attr in [
-                "modelname",
-                "external_ip",
-                "external_ipv6",
-            ]:
-                self._attributes[attr] = await self.hass.async_add_executor_job(
-                    lambda: getattr(status, attr)
-                )
-
-        except Exception:
-            _LOGGER.error("Error getting the state from the FRITZ!Box", exc_info=True)
+    def _update_from_source(self, data):
+        """Update state from the connectivity data."""
+        _LOGGER.debug("Updating Connectivity sensor...")
+        if data is None:
             self._is_available = False
+            return
 
-    async def async_update(self) -> None:
-        """Update data."""
-        _LOGGER.debug("Updating Connectivity sensor...")
-        await self._async_fetch_update()
+        self._is_on = data["is_on"]
+        self._is_available = True
+
+        last_reconnect = datetime.datetime.now() - datetime.timedelta(
+            seconds=data["uptime"]
+        )
+        self._attributes["last_reconnect"] = last_reconnect.replace(
+            microsecond=0
+        ).isoformat()
+
+        for attr in [
+            "modelname",
+            "external_ip",
+            "external_ipv6",
+        ]:
+            self._attributes[attr] = data[attr]
@@ -0,0 +1,98 @@
+"""Circuit breaker which stops the requests to an unreachable FRITZ!Box."""
+import asyncio
+import datetime
+import logging
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+# consecutive connection failures which open the breaker
+FAILURE_THRESHOLD = 3
+# while open, the box is probed with a single request at this interval
+PROBE_INTERVAL = datetime.timedelta(seconds=10)
+PROBE_TIMEOUT = 5  # seconds
+PROBE_SERVICE = "DeviceInfo1"
+PROBE_ACTION = "GetInfo"
+
+# the box did not answer at all: no connection or no response in time. SOAP faults, http
+# errors and local errors (e.g. PermissionError or errors of the requests library) are not
+CONNECTION_ERRORS = (
+    aiohttp.ClientConnectionError,
+    asyncio.TimeoutError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class CircuitBreaker:
+    """Count consecutive connection failures of a box and open after `failure_threshold` of them.
+
+    While open, requests fail at once instead of waiting for their timeout; the update
+    coordinator probes the box and the first answer closes the breaker again. Listeners are
+    called with the new state whenever the breaker opens or closes.
+    """
+
+    def __init__(self, host, failure_threshold=FAILURE_THRESHOLD):
+        """Init circuit breaker."""
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.failures = 0
+        self.is_open = False
+        self._listeners = []
+
+    def add_listener(self, update_callback):
+        """Add a listener which is called with is_open on every change, return a function to remove it."""
+        self._listeners.append(update_callback)
+
+        def remove_listener():
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    def check(self):
+        """Raise FritzConnectionException while the breaker is open."""
+        if self.is_open:
+            # pylint: disable=import-error
+            from fritzconnection.core.exceptions import FritzConnectionException
+
+            raise FritzConnectionException(
+                f"The FRITZ!Box {self.host} is unreachable, waiting for it to answer again"
+            )
+
+    def record(self, error):
+        """Record the outcome of a request, `error` is None on success.
+
+        Connection errors wrapped into fritzconnection exceptions count by their cause.
+        """
+        if error is not None and isinstance(error.__cause__, CONNECTION_ERRORS):
+            error = error.__cause__
+        if error is None or (
+            isinstance(error, Exception) and not isinstance(error, CONNECTION_ERRORS)
+        ):
+            self.failures = 0
+            self._set_open(False)
+        elif isinstance(error, CONNECTION_ERRORS):
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._set_open(True)
+        # cancelled requests tell nothing about the box
+
+    def trip(self):
+        """Open the breaker at once, e.g. when the box is about to reboot."""
+        self.failures = self.failure_threshold
+        self._set_open(True)
+
+    def _set_open(self, is_open):
+        if is_open == self.is_open:
+            return
+        self.is_open = is_open
+        if is_open:
+            _LOGGER.warning(
+                f"The FRITZ!Box {self.host} is unreachable, suspending requests and probing it "
+                f"every {PROBE_INTERVAL.total_seconds():.0f}s"
+            )
+        else:
+            _LOGGER.info(f"The FRITZ!Box {self.host} answers again, resuming requests")
+        for update_callback in list(self._listeners):
+            update_callback(is_open)
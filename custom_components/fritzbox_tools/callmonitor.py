@@ -0,0 +1,209 @@
+"""Listener for the call monitor of the FRITZ!Box (TCP port 1012)."""
+import asyncio
+import logging
+import re
+import socket
+
+from homeassistant.core import callback
+
+from .const import EVENT_CALL
+
+_LOGGER = logging.getLogger(__name__)
+
+CALL_MONITOR_PORT = 1012
+MIN_RECONNECT_DELAY = 1  # seconds
+MAX_RECONNECT_DELAY = 300  # seconds
+MAX_LINE_LENGTH = 1024
+
+CALL_TYPE_RING = "ring"
+CALL_TYPE_CALL = "call"
+CALL_TYPE_CONNECT = "connect"
+CALL_TYPE_DISCONNECT = "disconnect"
+
+# one line per event: date;TYPE;connection id;fields of the type;
+LINE_REGEXES = (
+    (
+        CALL_TYPE_RING,
+        re.compile(rb"([^;]*);RING;(\d+);([^;]*);([^;]*);([^;\r\n]*)"),
+        ("from", "to", "line"),
+    ),
+    (
+        CALL_TYPE_CALL,
+        re.compile(rb"([^;]*);CALL;(\d+);([^;]*);([^;]*);([^;]*);([^;\r\n]*)"),
+        ("device", "from", "to", "line"),
+    ),
+    (
+        CALL_TYPE_CONNECT,
+        re.compile(rb"([^;]*);CONNECT;(\d+);([^;]*);([^;\r\n]*)"),
+        ("device", "number"),
+    ),
+    (
+        CALL_TYPE_DISCONNECT,
+        re.compile(rb"([^;]*);DISCONNECT;(\d+);(\d*)"),
+        ("duration",),
+    ),
+)
+
+
+def parse_line(buffer, start=0, end=None):
+    """Return the event of the line in buffer[start:end] as dict or None for unknown lines.
+
+    The line is matched in place, only the fields of the event are copied out of the buffer.
+    """
+    if end is None:
+        end = len(buffer)
+    for call_type, regex, fields in LINE_REGEXES:
+        match = regex.match(buffer, start, end)
+        if match is None:
+            continue
+        event = {
+            "type": call_type,
+            "date": match.group(1).decode("utf-8", "replace"),
+            "connection_id": int(match.group(2)),
+        }
+        for idx, field in enumerate(fields, 3):
+            event[field] = match.group(idx).decode("utf-8", "replace")
+        if call_type == CALL_TYPE_DISCONNECT:
+            event["duration"] = int(event["duration"] or 0)
+        return event
+    return None
+
+
+class CallMonitorProtocol(asyncio.Protocol):
+    """Split the stream into lines and hand the parsed events to a callback.
+
+    The received data is appended to one buffer, the lines are parsed in place and the
+    buffer is compacted once per chunk instead of once per line.
+    """
+
+    def __init__(self, event_callback, connection_lost_callback):
+        """Init protocol."""
+        self._event_callback = event_callback
+        self._connection_lost_callback = connection_lost_callback
+        self._buffer = bytearray()
+        self.transport = None
+
+    def connection_made(self, transport):
+        """Enable keepalive, the box sends nothing while there are no calls."""
+        self.transport = transport
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+    def data_received(self, data):
+        """Parse all complete lines."""
+        buffer = self._buffer
+        buffer += data
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            event = parse_line(buffer, start, end)
+            if event is not None:
+                self._event_callback(event)
+            else:
+                _LOGGER.debug(f"Unknown call monitor line: {bytes(buffer[start:end])}")
+            start = end + 1
+        if start:
+            del buffer[:start]
+        if len(buffer) > MAX_LINE_LENGTH:
+            _LOGGER.debug("Dropping an overlong call monitor line")
+            buffer.clear()
+
+    def connection_lost(self, exc):
+        """Notify the monitor."""
+        self._connection_lost_callback(exc)
+
+
+class FritzBoxCallMonitor:
+    """Keep a connection to the call monitor of the box and fire its events.
+
+    The connection is established again with an exponential backoff if it fails or is
+    closed. Listeners (the sensor) are called with every event.
+    """
+
+    def __init__(self, fritzbox_tools, port=CALL_MONITOR_PORT):
+        """Init call monitor."""
+        self.fritzbox_tools = fritzbox_tools
+        self.port = port
+        self.connected = False
+        self._listeners = []
+        self._task = None
+        self._transport = None
+        self._closed = None
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Add a listener which is called with every event, return a function to remove it."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener():
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_start(self):
+        """Start connecting to the call monitor."""
+        self._task = self.fritzbox_tools.hass.async_create_task(self._async_run())
+
+    @callback
+    def async_stop(self):
+        """Close the connection and stop reconnecting."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    async def _async_run(self):
+        """Connect, wait for the connection to be lost and connect again with backoff."""
+        loop = asyncio.get_running_loop()
+        host = self.fritzbox_tools.host
+        delay = MIN_RECONNECT_DELAY
+        while True:
+            self._closed = loop.create_future()
+            try:
+                self._transport, _ = await loop.create_connection(
+                    lambda: CallMonitorProtocol(self._handle_event, self._handle_connection_lost),
+                    host,
+                    self.port,
+                )
+            except OSError as err:
+                _LOGGER.debug(
+                    f"Could not connect to the call monitor of {host}:{self.port}: {err}. "
+                    f"Dial #96*5* to enable it. Retrying in {delay}s"
+                )
+            else:
+                _LOGGER.debug(f"Connected to the call monitor of {host}:{self.port}")
+                self._set_connected(True)
+                delay = MIN_RECONNECT_DELAY
+                await self._closed
+                self._transport = None
+                self._set_connected(False)
+                _LOGGER.debug(f"Lost the call monitor of {host}, reconnecting in {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    @callback
+    def _handle_connection_lost(self, exc):
+        if self._closed is not None and not self._closed.done():
+            self._closed.set_result(None)
+
+    @callback
+    def _set_connected(self, connected):
+        self.connected = connected
+        for update_callback in list(self._listeners):
+            update_callback(None)
+
+    @callback
+    def _handle_event(self, event):
+        """Fire the event on the bus and notify the listeners."""
+        self.fritzbox_tools.hass.bus.async_fire(
+            EVENT_CALL, {"host": self.fritzbox_tools.host, **event}
+        )
+        for update_callback in list(self._listeners):
+            update_callback(event)
@@ -1,10 +1,14 @@
 """Support for AVM Fritz!Box classes."""
+import asyncio
 import logging
 import socket
+import time
 
 import voluptuous as vol
 
 from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    ATTR_STATE,
     CONF_DEVICES,
     CONF_HOST,
     CONF_PASSWORD,
@@ -16,15 +20,26 @@ from homeassistant.util import get_local_ip
 
 from .const import (
     ATTR_HOST,
+    ATTR_TARGETS,
+    ATTR_TIMEOUT,
+    CONF_MAX_CONCURRENT_REQUESTS,
     CONF_PROFILES,
+    CONF_REQUEST_TIMEOUT,
+    CONF_USE_CALL_MONITOR,
     CONF_USE_DEFLECTIONS,
+    CONF_USE_HOSTS,
     CONF_USE_PORT,
     CONF_USE_PROFILES,
     CONF_USE_WIFI,
     DEFAULT_HOST,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
     DEFAULT_PORT,
     DEFAULT_PROFILES,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_SERVICE_TIMEOUT,
+    DEFAULT_USE_CALL_MONITOR,
     DEFAULT_USE_DEFLECTIONS,
+    DEFAULT_USE_HOSTS,
     DEFAULT_USE_PORT,
     DEFAULT_USE_PROFILES,
     DEFAULT_USE_WIFI,
@@ -33,7 +48,26 @@ from .const import (
     ERROR_CONNECTION_ERROR,
     ERROR_CONNECTION_ERROR_PROFILES,
     ERROR_PROFILE_NOT_FOUND,
+    SOURCE_CONNECTIVITY,
 )
+from .breaker import PROBE_ACTION, PROBE_SERVICE, PROBE_TIMEOUT, CircuitBreaker
+from .callmonitor import FritzBoxCallMonitor
+from .coordinator import FritzBoxUpdateCoordinator
+from .deadlines import ActionDeadlines, remaining_fetch_time
+from .events import FritzBoxEventListener
+from .executor import get_executor
+from .gate import PRIORITY_READ, PRIORITY_WRITE, RequestGate, action_priority
+from .profiles import FritzProfileSession
+from .sources import (
+    ConnectivitySource,
+    DeflectionSource,
+    HostsSource,
+    PortMappingSource,
+    ProfileSource,
+    WifiSource,
+)
+from .stats import CallStatistics
+from .tr064 import AsyncFritzConnection
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -68,6 +102,14 @@ CONFIG_SCHEMA = vol.Schema(
                                     vol.Optional(CONF_USE_PORT): cv.string,
                                     vol.Optional(CONF_USE_WIFI): cv.string,
                                     vol.Optional(CONF_USE_DEFLECTIONS): cv.string,
+                                    vol.Optional(CONF_USE_HOSTS): cv.string,
+                                    vol.Optional(CONF_USE_CALL_MONITOR): cv.string,
+                                    vol.Optional(
+                                        CONF_MAX_CONCURRENT_REQUESTS
+                                    ): cv.positive_int,
+                                    vol.Optional(
+                                        CONF_REQUEST_TIMEOUT
+                                    ): cv.positive_int,
                                 }
                             )
                         ],
@@ -80,7 +122,29 @@ CONFIG_SCHEMA = vol.Schema(
     extra=vol.ALLOW_EXTRA,
 )
 
-SERVICE_SCHEMA = vol.Schema({vol.Required(ATTR_HOST): cv.string})
+SERVICE_SCHEMA = vol.Schema(
+    {
+        # hosts or serial numbers of the boxes, or "all"
+        vol.Required(ATTR_HOST): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_TIMEOUT, default=DEFAULT_SERVICE_TIMEOUT): cv.positive_int,
+    }
+)
+
+APPLY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_TARGETS): vol.All(
+            cv.ensure_list,
+            [
+                vol.Schema(
+                    {
+                        vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+                        vol.Required(ATTR_STATE): cv.boolean,
+                    }
+                )
+            ],
+        )
+    }
+)
 
 
 class FritzBoxTools:
@@ -88,7 +152,8 @@ class FritzBoxTools:
 
     """
     Attention: The initialization of the class performs sync I/O. If you're calling this from within Home Assistant,
-    wrap it in await self.hass.async_add_executor_job(lambda: FritzBoxTools(...))
+    wrap it in await executor.async_run(lambda: FritzBoxTools(..., executor=executor)) with the executor of the box
+    from get_executor(hass, host).
     """
 
     def __init__(
@@ -100,37 +165,69 @@ class FritzBoxTools:
         profile_list=DEFAULT_PROFILES,
         use_port=DEFAULT_USE_PORT,
         use_deflections=DEFAULT_USE_DEFLECTIONS,
+        use_hosts=DEFAULT_USE_HOSTS,
+        use_call_monitor=DEFAULT_USE_CALL_MONITOR,
         use_wifi=DEFAULT_USE_WIFI,
         use_profiles=DEFAULT_USE_PROFILES,
+        cache_dir=None,
+        max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS,
+        request_timeout=DEFAULT_REQUEST_TIMEOUT,
+        executor=None,
     ):
-        """Initialize FritzboxTools class."""
+        """Initialize FritzboxTools class.
+
+        If `cache_dir` is given, the service descriptions of the box are cached there.
+        At most `max_concurrent_requests` requests are sent to the box at the same time.
+        No request waits longer than `request_timeout` seconds for the box, the timeouts of
+        fast actions are shorter (see ActionDeadlines).
+        If the FritzBoxExecutor of the box is given as `executor`, the profiles log in on one of its
+        workers while the TR-064 connection is set up.
+        """
         # pylint: disable=import-error
         from fritzconnection import FritzConnection
         from fritzconnection.core.exceptions import FritzConnectionException
-        from fritzconnection.lib.fritzstatus import FritzStatus
-        from fritzprofiles import FritzProfileSwitch
-
-        # general timeout for all requests to the router. Some calls need quite some time.
 
+        self.profile_session = None
+        profile_session_future = None
         try:
-            self.connection = FritzConnection(
-                address=host, port=port, user=username, password=password, timeout=60.0
-            )
-            if profile_list != DEFAULT_PROFILES:
-                self.profile_switch = {
-                    profile: FritzProfileSwitch(
-                        "http://" + host, username, password, profile
-                    )
-                    for profile in profile_list
-                }
+            # the profiles log into the web interface, which is independent of TR-064
+            if profile_list and executor is not None:
+                profile_session_future = executor.submit(
+                    self._login_profiles, host, username, password, profile_list
+                )
+            if cache_dir is None:
+                self.connection = FritzConnection(
+                    address=host,
+                    port=port,
+                    user=username,
+                    password=password,
+                    timeout=float(request_timeout),
+                )
             else:
-                self.profile_switch = {}
+                from .descriptions import CachedFritzConnection
 
-            self.fritzstatus = FritzStatus(fc=self.connection)
-            self._unique_id = self.connection.call_action("DeviceInfo:1", "GetInfo")[
-                "NewSerialNumber"
-            ]
-            self._device_info = self._fetch_device_info()
+                self.connection = CachedFritzConnection(
+                    address=host,
+                    port=port,
+                    user=username,
+                    password=password,
+                    timeout=float(request_timeout),
+                    cache_dir=cache_dir,
+                )
+
+            # CachedFritzConnection already called GetInfo to find its cache
+            info = getattr(self.connection, "device_info", None)
+            if info is None:
+                info = self.connection.call_action("DeviceInfo:1", "GetInfo")
+            self._unique_id = info["NewSerialNumber"]
+            self._device_info = self._build_device_info(info)
+
+            if profile_session_future is not None:
+                self.profile_session = profile_session_future.result()
+            elif profile_list:
+                self.profile_session = self._login_profiles(
+                    host, username, password, profile_list
+                )
             self.success = True
             self.error = False
         except FritzConnectionException:
@@ -142,6 +239,10 @@ class FritzBoxTools:
         except AttributeError:
             self.success = False
             self.error = ERROR_PROFILE_NOT_FOUND
+        finally:
+            if profile_session_future is not None and self.profile_session is None:
+                # the TR-064 connection failed, do not leave the web interface logged in
+                self._close_profile_login(profile_session_future)
 
         self.ha_ip = get_local_ip()
         self.profile_list = profile_list
@@ -154,17 +255,214 @@ class FritzBoxTools:
         self.use_wifi = use_wifi
         self.use_port = use_port
         self.use_deflections = use_deflections
+        self.use_hosts = use_hosts
+        self.use_call_monitor = use_call_monitor
         self.use_profiles = use_profiles
 
-    def service_reconnect_fritzbox(self) -> None:
+        self.hass = None
+        self.executor = None
+        self.async_connection = None
+        self.coordinator = None
+        self.event_listener = None
+        self.call_monitor = None
+        self.unload_callbacks = []  # called by async_unload, e.g. to remove the listeners of platforms
+        self.call_statistics = CallStatistics()
+        self.switches = {}  # entity id -> switch entity, for the apply service
+        self.max_concurrent_requests = max_concurrent_requests
+        self.request_gate = RequestGate(max_concurrent_requests)
+        self.circuit_breaker = CircuitBreaker(host)
+        self.deadlines = ActionDeadlines(self.call_statistics, request_timeout)
+
+    async def async_setup(self, hass):
+        """Set up the async connection and the update coordinator shared by all entities, fetch the initial data."""
+        self.hass = hass
+        self.executor = get_executor(hass, self.host)
+        self.async_connection = AsyncFritzConnection(
+            self.connection,
+            self.username,
+            self.password,
+            connection_limit=self.max_concurrent_requests,
+        )
+        self.coordinator = FritzBoxUpdateCoordinator(
+            hass, self, self._create_sources()
+        )
+        await self.coordinator.async_refresh()
+
+        self.event_listener = FritzBoxEventListener(self)
+        try:
+            await self.event_listener.async_start()
+        except OSError:
+            _LOGGER.warning(
+                "Could not listen for events of the FRITZ!Box, polling all states",
+                exc_info=True,
+            )
+
+        if self.use_call_monitor and "X_AVM-DE_OnTel1" in self.connection.services:
+            self.call_monitor = FritzBoxCallMonitor(self)
+            self.call_monitor.async_start()
+
+    def _create_sources(self):
+        """Create the data sources of all enabled features."""
+        services = self.connection.services
+        sources = []
+        if self.use_wifi:
+            sources.append(WifiSource(self))
+        if (
+            self.use_port
+            and self.ha_ip != "127.0.0.1"
+            and "Layer3Forwarding1" in services
+        ):
+            sources.append(PortMappingSource(self))
+        if self.use_deflections and "X_AVM-DE_OnTel1" in services:
+            sources.append(DeflectionSource(self))
+        if self.use_profiles and self.profile_session is not None:
+            sources.append(ProfileSource(self))
+        if "WANIPConn1" in services:
+            sources.append(ConnectivitySource(self))
+        if (
+            self.use_hosts
+            and "Hosts1" in services
+            and "X_AVM-DE_GetHostListPath" in services["Hosts1"].actions
+        ):
+            sources.append(HostsSource(self))
+        return sources
+
+    async def async_unload(self):
+        """Cancel the event subscriptions, stop the call monitor and close the connection pool of the box."""
+        for unload_callback in self.unload_callbacks:
+            unload_callback()
+        self.unload_callbacks = []
+        if self.call_monitor is not None:
+            self.call_monitor.async_stop()
+        await self.event_listener.async_stop()
+        await self.async_connection.async_close()
+        if self.profile_session is not None:
+            await self.executor.async_run(self.profile_session.close)
+
+    @property
+    def connection_stats(self):
+        """Return the counters of the connection pool and the digest authentication."""
+        return self.async_connection.stats
+
+    async def async_call_action(self, service_name, action_name, **kwargs):
+        """Execute an action on the event loop and record its latency. Same arguments as FritzConnection.call_action.
+
+        Writes are sent before waiting polling reads if the box is busy. Raises
+        FritzConnectionException at once while the box is unreachable and if the box does
+        not answer within the deadline of the action.
+        """
+        # pylint: disable=import-error
+        from fritzconnection import FritzConnection
+
+        service_name = FritzConnection.normalize_name(service_name)
+        return await self._async_request(
+            service_name,
+            action_name,
+            action_priority(action_name),
+            lambda: self.async_connection.call_action(
+                service_name, action_name, **kwargs
+            ),
+        )
+
+    async def _async_request(self, service_name, action_name, priority, request):
+        """Send a request through the gate within the deadline of the action, record latency and outcome.
+
+        Within the fetch of a data source the deadline is also cut to the time left until the
+        next fetch of the source, so slow reads fail instead of overlapping the next cycle.
+        """
+        # pylint: disable=import-error
+        from fritzconnection.core.exceptions import FritzConnectionException
+
+        self.circuit_breaker.check()
+        async with self.request_gate.async_slot(priority):
+            timeout = self.deadlines.timeout(service_name, action_name)
+            remaining = remaining_fetch_time()
+            cut = remaining is not None and remaining < timeout
+            if cut:
+                if remaining <= 0:
+                    raise FritzConnectionException(
+                        f"No time left for {service_name} {action_name} in this update"
+                    )
+                timeout = remaining
+
+            start = time.monotonic()
+            error = None
+            try:
+                return await asyncio.wait_for(request(), timeout)
+            except asyncio.TimeoutError as err:
+                error = err
+                raise FritzConnectionException(
+                    f"The FRITZ!Box did not answer {service_name} {action_name} within {timeout:.1f}s"
+                ) from err
+            except (Exception, asyncio.CancelledError) as err:
+                error = err
+                raise
+            finally:
+                self.call_statistics.record(
+                    service_name, action_name, time.monotonic() - start, error
+                )
+                # running out of update time does not mean the box is unreachable
+                if not (cut and isinstance(error, asyncio.TimeoutError)):
+                    self.circuit_breaker.record(error)
+
+    async def async_probe(self):
+        """Send a single cheap request while the circuit breaker is open, return whether the box answered.
+
+        The probe does not wait for the request gate, whose slots may be held by requests
+        which are still waiting for their timeout.
+        """
+        start = time.monotonic()
+        error = None
+        try:
+            await asyncio.wait_for(
+                self.async_connection.call_action(PROBE_SERVICE, PROBE_ACTION),
+                PROBE_TIMEOUT,
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            error = err
+        self.call_statistics.record(
+            PROBE_SERVICE, PROBE_ACTION, time.monotonic() - start, error
+        )
+        self.circuit_breaker.record(error)
+        return not self.circuit_breaker.is_open
+
+    async def async_download_list(self, service_name, path, record_type):
+        """Download an xml list which an action of `service_name` returned the path of, return its records.
+
+        Recorded as download of the service in the call statistics.
+        """
+        return await self._async_request(
+            service_name,
+            "download",
+            PRIORITY_READ,
+            lambda: self.async_connection.download_list(path, record_type),
+        )
+
+    async def async_call_profiles(self, method_name, *args):
+        """Call a method of the profile session in the executor of the box, set_state before reads.
+
+        Recorded as action of the service "profiles" and subject to the same deadlines as the actions.
+        """
+        return await self._async_request(
+            "profiles",
+            method_name,
+            PRIORITY_WRITE if method_name == "set_state" else PRIORITY_READ,
+            lambda: self.executor.async_run(getattr(self.profile_session, method_name), *args),
+        )
+
+    async def async_service_reconnect_fritzbox(self) -> None:
         """Define service reconnect."""
-        _LOGGER.info("Reconnecting the fritzbox.")
-        self.connection.reconnect()
+        _LOGGER.info(f"Reconnecting the fritzbox {self.host}.")
+        await self.async_call_action("WANIPConn1", "ForceTermination")
+        if SOURCE_CONNECTIVITY in self.coordinator.sources:
+            await self.coordinator.async_invalidate_sources([SOURCE_CONNECTIVITY])
 
-    def service_reboot_fritzbox(self) -> None:
+    async def async_service_reboot_fritzbox(self) -> None:
         """Define service reboot."""
-        _LOGGER.info("Rebooting the fritzbox.")
-        self.connection.call_action("DeviceConfig1", "Reboot")
+        _LOGGER.info(f"Rebooting the fritzbox {self.host}.")
+        await self.async_call_action("DeviceConfig1", "Reboot")
+        # do not wait for the timeouts of the requests to the rebooting box
+        self.circuit_breaker.trip()
 
     def is_ok(self):
         """Return status."""
@@ -185,9 +483,29 @@ class FritzBoxTools:
         """Return device info."""
         return self._device_info
 
-    def _fetch_device_info(self):
-        """Fetch device info."""
-        info = self.connection.call_action("DeviceInfo:1", "GetInfo")
+    @staticmethod
+    def _login_profiles(host, username, password, profile_list):
+        """Log into the web interface once for all profiles and check they exist. Performs sync I/O."""
+        session = FritzProfileSession(host, username, password)
+        try:
+            for profile in profile_list:
+                session.get_profile_id(profile)
+        except AttributeError:
+            session.close()
+            raise
+        return session
+
+    @staticmethod
+    def _close_profile_login(future):
+        """Wait for a profile login and close its session if it succeeded. Performs sync I/O."""
+        try:
+            session = future.result()
+        except Exception:  # pylint: disable=broad-except
+            return  # the login failed as well, nothing is open
+        session.close()
+
+    def _build_device_info(self, info):
+        """Build device info from the DeviceInfo GetInfo response."""
         return {
             "identifiers": {
                 # Serial numbers are unique identifiers within a specific domain
@@ -12,23 +12,33 @@ from homeassistant.components.ssdp import (
 )
 from homeassistant.config_entries import ConfigFlow
 from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_PORT, CONF_USERNAME
+from homeassistant.helpers.storage import STORAGE_DIR
 
 from .common import CONFIG_SCHEMA, FritzBoxTools
 from .const import (
+    CONF_MAX_CONCURRENT_REQUESTS,
     CONF_PROFILES,
+    CONF_REQUEST_TIMEOUT,
+    CONF_USE_CALL_MONITOR,
     CONF_USE_DEFLECTIONS,
+    CONF_USE_HOSTS,
     CONF_USE_PORT,
     CONF_USE_PROFILES,
     CONF_USE_WIFI,
     DEFAULT_HOST,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
     DEFAULT_PORT,
     DEFAULT_PROFILES,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_USE_CALL_MONITOR,
     DEFAULT_USE_DEFLECTIONS,
+    DEFAULT_USE_HOSTS,
     DEFAULT_USE_PORT,
     DEFAULT_USE_PROFILES,
     DEFAULT_USE_WIFI,
     DOMAIN,
 )
+from .executor import get_executor
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -87,16 +97,19 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
         username = user_input.get(CONF_USERNAME)
         password = user_input.get(CONF_PASSWORD)
 
-        self.fritz_tools = await self.hass.async_add_executor_job(
+        executor = get_executor(self.hass, host)
+        self.fritz_tools = await executor.async_run(
             lambda: FritzBoxTools(
                 host=host,
                 port=port,
                 username=username,
                 password=password,
                 profile_list=[],
+                cache_dir=self.hass.config.path(STORAGE_DIR, DOMAIN),
+                executor=executor,
             )
         )
-        success, error = await self.hass.async_add_executor_job(self.fritz_tools.is_ok)
+        success, error = self.fritz_tools.is_ok()
 
         if not success:
             errors["base"] = error
@@ -157,6 +170,17 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
                     vol.Required(
                         CONF_USE_DEFLECTIONS, default=DEFAULT_USE_DEFLECTIONS
                     ): bool,
+                    vol.Required(CONF_USE_HOSTS, default=DEFAULT_USE_HOSTS): bool,
+                    vol.Required(
+                        CONF_USE_CALL_MONITOR, default=DEFAULT_USE_CALL_MONITOR
+                    ): bool,
+                    vol.Required(
+                        CONF_MAX_CONCURRENT_REQUESTS,
+                        default=DEFAULT_MAX_CONCURRENT_REQUESTS,
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+                    vol.Required(
+                        CONF_REQUEST_TIMEOUT, default=DEFAULT_REQUEST_TIMEOUT
+                    ): vol.All(vol.Coerce(int), vol.Range(min=5, max=300)),
                 }
             ),
             errors=errors or {},
@@ -178,17 +202,20 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
         username = user_input.get(CONF_USERNAME)
         password = user_input.get(CONF_PASSWORD)
 
-        self.fritz_tools = await self.hass.async_add_executor_job(
+        executor = get_executor(self.hass, host)
+        self.fritz_tools = await executor.async_run(
             lambda: FritzBoxTools(
                 host=host,
                 port=port,
                 username=username,
                 password=password,
                 profile_list=[],
+                cache_dir=self.hass.config.path(STORAGE_DIR, DOMAIN),
+                executor=executor,
             )
         )
 
-        success, error = await self.hass.async_add_executor_job(self.fritz_tools.is_ok)
+        success, error = self.fritz_tools.is_ok()
         self._name = self.fritz_tools.device_info["model"]
 
         for entry in self.hass.config_entries.async_entries(DOMAIN):
@@ -208,8 +235,18 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
         self._use_deflections = user_input.get(
             CONF_USE_DEFLECTIONS, DEFAULT_USE_DEFLECTIONS
         )
+        self._use_hosts = user_input.get(CONF_USE_HOSTS, DEFAULT_USE_HOSTS)
+        self._use_call_monitor = user_input.get(
+            CONF_USE_CALL_MONITOR, DEFAULT_USE_CALL_MONITOR
+        )
         self._use_wifi = user_input.get(CONF_USE_WIFI, DEFAULT_USE_WIFI)
         self._use_profiles = user_input.get(CONF_USE_PROFILES, DEFAULT_USE_PROFILES)
+        self._max_concurrent_requests = user_input.get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        )
+        self._request_timeout = user_input.get(
+            CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT
+        )
 
         if self._use_profiles:
             errors = {}
@@ -226,8 +263,12 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
                     CONF_PROFILES: profiles,
                     CONF_USE_WIFI: self._use_wifi,
                     CONF_USE_DEFLECTIONS: self._use_deflections,
+                    CONF_USE_HOSTS: self._use_hosts,
+                    CONF_USE_CALL_MONITOR: self._use_call_monitor,
                     CONF_USE_PORT: self._use_port,
                     CONF_USE_PROFILES: self._use_profiles,
+                    CONF_MAX_CONCURRENT_REQUESTS: self._max_concurrent_requests,
+                    CONF_REQUEST_TIMEOUT: self._request_timeout,
                 },
             )
 
@@ -237,16 +278,19 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
         if isinstance(profiles, str):
             profiles = profiles.replace(", ", ",").split(",")
 
-        self.fritz_tools = await self.hass.async_add_executor_job(
+        executor = get_executor(self.hass, self.fritz_tools.host)
+        self.fritz_tools = await executor.async_run(
             lambda: FritzBoxTools(
                 host=self.fritz_tools.host,
                 port=self.fritz_tools.port,
                 username=self.fritz_tools.username,
                 password=self.fritz_tools.password,
                 profile_list=profiles,
+                cache_dir=self.hass.config.path(STORAGE_DIR, DOMAIN),
+                executor=executor,
             )
         )
-        success, error = await self.hass.async_add_executor_job(self.fritz_tools.is_ok)
+        success, error = self.fritz_tools.is_ok()
 
         errors = {}
         if not success:
@@ -263,8 +307,12 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
                 CONF_PROFILES: profiles,
                 CONF_USE_WIFI: self._use_wifi,
                 CONF_USE_DEFLECTIONS: self._use_deflections,
+                CONF_USE_HOSTS: self._use_hosts,
+                CONF_USE_CALL_MONITOR: self._use_call_monitor,
                 CONF_USE_PORT: self._use_port,
                 CONF_USE_PROFILES: self._use_profiles,
+                CONF_MAX_CONCURRENT_REQUESTS: self._max_concurrent_requests,
+                CONF_REQUEST_TIMEOUT: self._request_timeout,
             },
         )
 
@@ -289,16 +337,19 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
         if isinstance(profiles, str):
             profiles = profiles.replace(" ", "").split(",")
 
-        fritz_tools = await self.hass.async_add_executor_job(
+        executor = get_executor(self.hass, host)
+        fritz_tools = await executor.async_run(
             lambda: FritzBoxTools(
                 host=host,
                 port=port,
                 username=username,
                 password=password,
                 profile_list=profiles,
+                cache_dir=self.hass.config.path(STORAGE_DIR, DOMAIN),
+                executor=executor,
             )
         )
-        success, error = await self.hass.async_add_executor_job(fritz_tools.is_ok)
+        success, error = fritz_tools.is_ok()
         self._name = fritz_tools.device_info["model"]
 
         for entry in self.hass.config_entries.async_entries(DOMAIN):
@@ -320,8 +371,16 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
                 CONF_PROFILES: profiles,
                 CONF_USE_WIFI: DEFAULT_USE_WIFI,
                 CONF_USE_DEFLECTIONS: DEFAULT_USE_DEFLECTIONS,
+                CONF_USE_HOSTS: DEFAULT_USE_HOSTS,
+                CONF_USE_CALL_MONITOR: DEFAULT_USE_CALL_MONITOR,
                 CONF_USE_PORT: DEFAULT_USE_PORT,
                 CONF_USE_PROFILES: DEFAULT_USE_PROFILES,
+                CONF_MAX_CONCURRENT_REQUESTS: import_config.get(
+                    CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+                ),
+                CONF_REQUEST_TIMEOUT: import_config.get(
+                    CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT
+                ),
             },
         )
 
@@ -337,8 +396,18 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
         self._use_deflections = entry.data.get(
             CONF_USE_DEFLECTIONS, DEFAULT_USE_DEFLECTIONS
         )
+        self._use_hosts = entry.data.get(CONF_USE_HOSTS, DEFAULT_USE_HOSTS)
+        self._use_call_monitor = entry.data.get(
+            CONF_USE_CALL_MONITOR, DEFAULT_USE_CALL_MONITOR
+        )
         self._use_wifi = entry.data.get(CONF_USE_WIFI, DEFAULT_USE_WIFI)
         self._use_profiles = entry.data.get(CONF_USE_PROFILES, DEFAULT_USE_PROFILES)
+        self._max_concurrent_requests = entry.data.get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        )
+        self._request_timeout = entry.data.get(
+            CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT
+        )
 
         return await self.async_step_reauth_confirm()
 
@@ -372,17 +441,20 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
         username = user_input.get(CONF_USERNAME)
         password = user_input.get(CONF_PASSWORD)
 
-        self.fritz_tools = await self.hass.async_add_executor_job(
+        executor = get_executor(self.hass, host)
+        self.fritz_tools = await executor.async_run(
             lambda: FritzBoxTools(
                 host=host,
                 port=port,
                 username=username,
                 password=password,
                 profile_list=[],
+                cache_dir=self.hass.config.path(STORAGE_DIR, DOMAIN),
+                executor=executor,
             )
         )
 
-        success, error = await self.hass.async_add_executor_job(self.fritz_tools.is_ok)
+        success, error = self.fritz_tools.is_ok()
         if not success:
             errors["base"] = error
             return self._show_setup_form_reauth_confirm(
@@ -399,8 +471,12 @@ class FritzBoxToolsFlowHandler(ConfigFlow):
                 CONF_PROFILES: self._profiles,
                 CONF_USE_WIFI: self._use_wifi,
                 CONF_USE_DEFLECTIONS: self._use_deflections,
+                CONF_USE_HOSTS: self._use_hosts,
+                CONF_USE_CALL_MONITOR: self._use_call_monitor,
                 CONF_USE_PORT: self._use_port,
                 CONF_USE_PROFILES: self._use_profiles,
+                CONF_MAX_CONCURRENT_REQUESTS: self._max_concurrent_requests,
+                CONF_REQUEST_TIMEOUT: self._request_timeout,
             },
         )
         await self.hass.config_entries.async_reload(self._entry.entry_id)
@@ -2,16 +2,26 @@
 
 DOMAIN = "fritzbox_tools"
 DATA_FRITZ_TOOLS_INSTANCE = "fritzbox_tools_instance"
-SUPPORTED_DOMAINS = ["switch", "binary_sensor"]
+DATA_FRITZ_TOOLS_INDEX = "fritzbox_tools_index"  # host and serial number -> instance
+DATA_FRITZ_TOOLS_EXECUTOR = "fritzbox_tools_executor"  # worker pools by host
+SUPPORTED_DOMAINS = ["switch", "binary_sensor", "device_tracker", "sensor"]
 
 ATTR_HOST = "host"
+ATTR_TARGETS = "targets"
+ATTR_TIMEOUT = "timeout"
+
+HOST_ALL = "all"
 
 CONF_PROFILES = "profiles"
 
 CONF_USE_WIFI = "use_wifi"
 CONF_USE_PORT = "use_port"
 CONF_USE_DEFLECTIONS = "use_deflections"
+CONF_USE_HOSTS = "use_hosts"
+CONF_USE_CALL_MONITOR = "use_call_monitor"
 CONF_USE_PROFILES = "use_profiles"
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+CONF_REQUEST_TIMEOUT = "request_timeout"
 
 DEFAULT_HOST = "192.168.178.1"  # set to fritzbox default
 DEFAULT_PORT = 49000  # set to fritzbox default
@@ -20,12 +30,31 @@ DEFAULT_USERNAME = ""  # set to fritzbox default?!
 DEFAULT_USE_WIFI = True
 DEFAULT_USE_PORT = True
 DEFAULT_USE_DEFLECTIONS = True
+DEFAULT_USE_HOSTS = False  # the host list is polled every few seconds
+DEFAULT_USE_CALL_MONITOR = False  # keeps a connection to the box open
 DEFAULT_USE_PROFILES = True
 
 DEFAULT_PROFILES = []
 
+DEFAULT_MAX_CONCURRENT_REQUESTS = 3
+DEFAULT_REQUEST_TIMEOUT = 60  # seconds, cap of the learned timeouts of all actions
+
+DEFAULT_SERVICE_TIMEOUT = 30  # seconds per box
+
 SERVICE_RECONNECT = "reconnect"
 SERVICE_REBOOT = "reboot"
+SERVICE_CALL_STATISTICS = "call_statistics"
+SERVICE_APPLY = "apply"
+
+EVENT_CALL_STATISTICS = f"{DOMAIN}_call_statistics"
+EVENT_CALL = f"{DOMAIN}_call"
+
+SOURCE_CONNECTIVITY = "connectivity"
+SOURCE_DEFLECTIONS = "deflections"
+SOURCE_HOSTS = "hosts"
+SOURCE_PORT_MAPPINGS = "port_mappings"
+SOURCE_PROFILES = "profiles"
+SOURCE_WIFI = "wifi"
 
 ERROR_CONNECTION_ERROR = "connection_error"
 ERROR_CONNECTION_ERROR_PROFILES = "connection_error_profiles"
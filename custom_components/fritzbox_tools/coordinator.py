@@ -0,0 +1,254 @@
+"""Update coordinator shared by all entities of a FRITZ!Box."""
+from abc import abstractmethod
+import asyncio
+import datetime
+import logging
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .breaker import PROBE_INTERVAL
+from .const import DOMAIN, SERVICE_CALL_STATISTICS
+from .deadlines import FETCH_DEADLINE
+
+_LOGGER = logging.getLogger(__name__)
+
+# the interval of a source grows by this factor with every fetch without changes or with an error
+BACKOFF_FACTOR = 1.5
+# the interval of a source is at least this multiple of the duration of its last fetch
+SLOW_RESPONSE_FACTOR = 10
+MIN_SCHEDULE_DELAY = 1  # seconds
+# sources whose changes are pushed by events are polled only as fallback
+PUSH_FALLBACK_INTERVAL = datetime.timedelta(minutes=15)
+
+
+class FritzBoxUpdateCoordinator(DataUpdateCoordinator):
+    """Fetch every data source of a FRITZ!Box when it is due and notify all subscribed entities.
+
+    Every source has its own interval which adapts to the data and the box: it backs off
+    while the data does not change, the fetch fails or the box answers slowly, returns to the
+    default interval as soon as the data changes and drops to the minimum after a write.
+    While the circuit breaker of the box is open, all sources are unavailable and every
+    update is a single probe request instead.
+    """
+
+    def __init__(self, hass, fritzbox_tools, sources):
+        """Init update coordinator."""
+        self.fritzbox_tools = fritzbox_tools
+        self.sources = {source.name: source for source in sources}
+        self.failed_sources = set()
+        self._next_update = {}
+        self._intervals = {source.name: source.update_interval for source in sources}
+        self.push_sources = set()
+        update_interval = min(
+            (source.update_interval for source in sources), default=None
+        )
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_{fritzbox_tools.host}",
+            update_interval=update_interval,
+        )
+        self.data = {}
+        fritzbox_tools.circuit_breaker.add_listener(self._handle_breaker_change)
+
+    def get_source_data(self, name):
+        """Return the latest data of a source or None if its last fetch failed."""
+        if name in self.failed_sources:
+            return None
+        return self.data.get(name)
+
+    def get_update_interval(self, name):
+        """Return the current update interval of a source."""
+        return self._intervals[name]
+
+    def set_push_source(self, name, push):
+        """Mark a source as updated by events (polled only as fallback) or as polled."""
+        if push:
+            self.push_sources.add(name)
+        else:
+            self.push_sources.discard(name)
+            self._next_update.pop(name, None)
+
+    @callback
+    def async_push_event(self, name, service_name, variables):
+        """Apply the evented variables of a service to the data of a source.
+
+        Fetches the source at once if the source cannot derive its new data from the event.
+        """
+        source = self.sources[name]
+        data = self.get_source_data(name)
+        new_data = None
+        if data is not None:
+            new_data = source.apply_event(data, service_name, variables)
+        if new_data is None:
+            self.hass.async_create_task(self.async_invalidate_sources([name]))
+        elif source.has_changed(data, new_data):
+            self.async_set_updated_data({**self.data, name: new_data})
+
+    async def async_invalidate_sources(self, names):
+        """Drop the cached data of the sources after writes and fetch them with a single refresh.
+
+        The sources are polled at their minimum interval afterwards, so changes caused by the
+        writes show up quickly.
+        """
+        for name in names:
+            source = self.sources.get(name)
+            if source is not None:
+                self._intervals[name] = source.min_update_interval
+            self._next_update.pop(name, None)
+        await self.async_request_refresh()
+
+    @callback
+    def _handle_breaker_change(self, is_open):
+        """Mark all sources unavailable at once when the box becomes unreachable, fetch all when it is back."""
+        self._next_update.clear()
+        if is_open:
+            self.failed_sources.update(self.sources)
+            self.update_interval = PROBE_INTERVAL
+            self.async_set_updated_data(self.data)
+        else:
+            self.hass.async_create_task(self.async_request_refresh())
+
+    async def _async_update_data(self):
+        """Fetch all sources which are due, or probe the box while it is unreachable."""
+        if self.fritzbox_tools.circuit_breaker.is_open:
+            if not await self.fritzbox_tools.async_probe():
+                self.update_interval = PROBE_INTERVAL
+                return self.data
+
+        now = time.monotonic()
+        due = [
+            source
+            for source in self.sources.values()
+            if self._next_update.get(source.name, 0) <= now
+        ]
+        results = await asyncio.gather(
+            *(self._async_fetch(source) for source in due),
+            return_exceptions=True,
+        )
+
+        data = dict(self.data)
+        for source, result in zip(due, results):
+            if isinstance(result, Exception):
+                _LOGGER.error(
+                    f"Error fetching {source.name} from the FRITZ!Box",
+                    exc_info=result,
+                )
+                self.failed_sources.add(source.name)
+                self._schedule_source(source, changed=False, duration=0)
+                continue
+
+            source_data, duration = result
+            if duration > source.update_interval.total_seconds():
+                _LOGGER.warning(
+                    f"Fetching {source.name} from the FRITZ!Box took {duration:.1f}s, "
+                    f"longer than its interval of {source.update_interval.total_seconds():.0f}s. "
+                    f"Call the service {DOMAIN}.{SERVICE_CALL_STATISTICS} to find the slow requests"
+                )
+            changed = source.name not in data or source.has_changed(
+                data[source.name], source_data
+            )
+            self.failed_sources.discard(source.name)
+            data[source.name] = source_data
+            self._schedule_source(source, changed, duration)
+
+        if self.fritzbox_tools.circuit_breaker.is_open:
+            # opened during this update
+            self.failed_sources.update(self.sources)
+            self.update_interval = PROBE_INTERVAL
+            return data
+
+        next_update = min(self._next_update.values(), default=None)
+        if next_update is not None:
+            self.update_interval = datetime.timedelta(
+                seconds=max(next_update - time.monotonic(), MIN_SCHEDULE_DELAY)
+            )
+        return data
+
+    async def _async_fetch(self, source):
+        """Fetch a source, return its data and the duration of the fetch.
+
+        The requests of the fetch must be done before the next fetch of the source is due. The
+        first fetch of a source is only bound by the timeouts of its requests, a box with large
+        tables may need longer than one interval for it and its entities are created from it.
+        """
+        start = time.monotonic()
+        # runs in its own task of the gather, so the deadline is set for this source only
+        if source.name in self.data:
+            FETCH_DEADLINE.set(start + self._intervals[source.name].total_seconds())
+        source_data = await source.async_fetch()
+        return source_data, time.monotonic() - start
+
+    def _schedule_source(self, source, changed, duration):
+        """Adapt the interval of a source after a fetch and schedule its next fetch."""
+        interval = self._intervals[source.name]
+        if changed:
+            interval = min(interval, source.update_interval)
+        else:
+            interval = interval * BACKOFF_FACTOR
+        interval = max(
+            min(interval, source.max_update_interval), source.min_update_interval
+        )
+        # do not keep a slow box busy with this source
+        interval = max(interval, datetime.timedelta(seconds=duration * SLOW_RESPONSE_FACTOR))
+        if source.name in self.push_sources:
+            interval = max(interval, PUSH_FALLBACK_INTERVAL)
+
+        if interval != self._intervals[source.name]:
+            _LOGGER.debug(
+                f"Update interval of {source.name} is now {interval.total_seconds():.0f}s "
+                f"(last fetch took {duration:.2f}s)"
+            )
+        self._intervals[source.name] = interval
+        self._next_update[source.name] = time.monotonic() + interval.total_seconds()
+
+
+class FritzBoxCoordinatorEntity(Entity):
+    """Entity whose state is pushed by the update coordinator instead of being polled.
+
+    Subclasses set `coordinator` and `_source` and implement `_update_from_source`, which is
+    only called if the data of the source was fetched again since the last call.
+    """
+
+    coordinator = None
+    _source = None
+    _source_data = None
+
+    @property
+    def should_poll(self) -> bool:
+        """No polling needed, the coordinator notifies the entity."""
+        return False
+
+    @property
+    def source_name(self):
+        """Return the name of the data source of the entity."""
+        return self._source
+
+    async def async_added_to_hass(self):
+        """Subscribe to the coordinator."""
+        self.async_on_remove(
+            self.coordinator.async_add_listener(self._handle_coordinator_update)
+        )
+        self._source_data = self.coordinator.get_source_data(self._source)
+        self._update_from_source(self._source_data)
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Apply the new data of the coordinator, unless another source was refreshed."""
+        data = self.coordinator.get_source_data(self._source)
+        if data is self._source_data and data is not None:
+            return
+        self._source_data = data
+        self._update_from_source(data)
+        self.async_write_ha_state()
+
+    async def async_update(self):
+        """Update the entity on request."""
+        await self.coordinator.async_request_refresh()
+
+    @abstractmethod
+    def _update_from_source(self, data):
+        """Update the entity state from the source data. `data` is None if the fetch failed."""
@@ -0,0 +1,53 @@
+"""Timeouts of the requests to a FRITZ!Box, learned per action from its latency histogram."""
+import contextvars
+import time
+
+# the timeout of an action is this multiple of its 95th percentile latency
+LATENCY_FACTOR = 4
+LATENCY_PERCENTILE = 0.95
+# calls of an action needed before its timeout is learned, the cap is used until then
+MIN_SAMPLES = 10
+MIN_TIMEOUT = 2  # seconds
+
+# monotonic time at which the running fetch of a data source must be done, set by the coordinator
+FETCH_DEADLINE = contextvars.ContextVar("fritzbox_tools_fetch_deadline", default=None)
+
+
+def remaining_fetch_time():
+    """Return the seconds left for the running fetch of a data source, None outside of fetches."""
+    deadline = FETCH_DEADLINE.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class ActionDeadlines:
+    """Table of the timeouts per (service, action), derived from the call statistics of the box.
+
+    Cheap reads time out after a few seconds while slow actions keep a long timeout. Every
+    timeout is at most `max_timeout`, which is also used for actions without enough calls
+    yet and for actions whose percentile lies in the unbounded histogram bucket. Timeouts are
+    recorded with the timeout as latency, so an action which times out often gets more time.
+    """
+
+    def __init__(self, call_statistics, max_timeout):
+        """Init deadlines."""
+        self.call_statistics = call_statistics
+        self.max_timeout = max_timeout
+
+    def timeout(self, service_name, action_name):
+        """Return the timeout of an action in seconds."""
+        histogram = self.call_statistics.get(service_name, action_name)
+        if histogram is None or histogram.count < MIN_SAMPLES:
+            return self.max_timeout
+        latency = histogram.percentile(LATENCY_PERCENTILE)
+        if latency is None:
+            return self.max_timeout
+        return min(max(latency / 1000 * LATENCY_FACTOR, MIN_TIMEOUT), self.max_timeout)
+
+    def as_dict(self):
+        """Return the timeouts of all called actions keyed by "service.action"."""
+        return {
+            f"{service_name}.{action_name}": round(self.timeout(service_name, action_name), 1)
+            for service_name, action_name in self.call_statistics.calls()
+        }
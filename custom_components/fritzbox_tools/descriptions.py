@@ -0,0 +1,153 @@
+"""On-disk cache of the TR-064 service descriptions of a FRITZ!Box."""
+import json
+import logging
+import os
+from xml.etree import ElementTree as etree
+
+# pylint: disable=import-error
+from fritzconnection import FritzConnection
+from fritzconnection.core.devices import DeviceManager
+from fritzconnection.core.exceptions import FritzConnectionException
+from fritzconnection.core.fritzconnection import FRITZ_DESCRIPTIONS
+from fritzconnection.core.processor import Scpd
+from fritzconnection.core.soaper import Soaper, raise_fritzconnection_error
+from fritzconnection.core.utils import get_content_from
+import requests
+from requests.auth import HTTPDigestAuth
+
+_LOGGER = logging.getLogger(__name__)
+
+DEVICE_INFO_SERVICE_TYPE = "urn:dslforum-org:service:DeviceInfo:1"
+DEVICE_INFO_CONTROL_URL = "/upnp/control/deviceinfo"
+
+
+class CachedFritzConnection(FritzConnection):
+    """FritzConnection which loads tr64desc.xml, igddesc.xml and the scpd files from an on-disk cache.
+
+    The cache is keyed by the serial number and the software version of the box. Both are
+    read with a single DeviceInfo GetInfo request before anything else, so a firmware update
+    or a replaced box invalidate the cache. The response is kept in `device_info`.
+    """
+
+    def __init__(self, address, port, user, password, timeout, cache_dir):
+        """Init connection like FritzConnection does, but without downloading known descriptions."""
+        # pylint: disable=super-init-not-called
+        address = self.set_protocol(address, False)
+        session = requests.Session()
+        session.verify = False
+        if password:
+            session.auth = HTTPDigestAuth(user, password)
+        self.address = address
+        self.session = session
+        self.timeout = timeout
+        self.port = port
+        self.soaper = Soaper(
+            address, port, user, password, timeout=timeout, session=session
+        )
+
+        self.device_info = self._get_device_info()
+        serial = self.device_info["NewSerialNumber"]
+        cache_file = os.path.join(
+            cache_dir, f"{serial}_{self.device_info['NewSoftwareVersion']}.json"
+        )
+        if not self._load_cache(cache_file):
+            self._load_descriptions(cache_file)
+            self._remove_outdated_cache_files(cache_dir, serial, cache_file)
+
+    def _get_device_info(self):
+        """Call DeviceInfo:1 GetInfo without knowing the service descriptions yet."""
+        headers = Soaper.headers.copy()
+        headers["soapaction"] = f"{DEVICE_INFO_SERVICE_TYPE}#GetInfo"
+        body = Soaper.body_template.format(
+            service_type=DEVICE_INFO_SERVICE_TYPE, action_name="GetInfo", arguments=""
+        )
+        envelope = Soaper.envelope.format(body=body).encode("utf-8")
+        with self.session.post(
+            f"{self.address}:{self.port}{DEVICE_INFO_CONTROL_URL}",
+            data=envelope,
+            headers=headers,
+            timeout=self.timeout,
+        ) as response:
+            if response.status_code != 200:
+                raise_fritzconnection_error(response)
+            root = etree.fromstring(response.content)
+
+        response_node = root.find(".//{%s}GetInfoResponse" % DEVICE_INFO_SERVICE_TYPE)
+        if response_node is None:
+            raise FritzConnectionException("Invalid DeviceInfo GetInfo response")
+        return {node.tag: node.text or "" for node in response_node}
+
+    def _load_cache(self, cache_file):
+        """Set up the services from the cache file. Returns False if there is no valid cache."""
+        try:
+            with open(cache_file, encoding="utf-8") as fobj:
+                cache = json.load(fobj)
+            self._process_descriptions(cache["descriptions"], cache["scpds"])
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, etree.ParseError):
+            _LOGGER.warning(
+                f"Invalid service description cache {cache_file}, reloading it from the FRITZ!Box",
+                exc_info=True,
+            )
+            return False
+        _LOGGER.debug(f"Loaded service descriptions from {cache_file}")
+        return True
+
+    def _load_descriptions(self, cache_file):
+        """Download the descriptions and scpd files from the box and write them to the cache file."""
+        descriptions = []
+        for description in FRITZ_DESCRIPTIONS:
+            try:
+                descriptions.append(self._get_content(f"/{description}"))
+            except FritzConnectionException:
+                # resource not available:
+                # this can happen on devices not providing an igddesc-file.
+                pass
+        scpds = self._process_descriptions(descriptions, {})
+
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(f"{cache_file}.tmp", "w", encoding="utf-8") as fobj:
+                json.dump({"descriptions": descriptions, "scpds": scpds}, fobj)
+            os.replace(f"{cache_file}.tmp", cache_file)
+        except OSError:
+            _LOGGER.warning(
+                f"Could not write service description cache {cache_file}", exc_info=True
+            )
+
+    def _process_descriptions(self, descriptions, scpds):
+        """Set up the device manager from the description xmls, download missing scpds. Returns all scpds."""
+        self.device_manager = DeviceManager(timeout=self.timeout, session=self.session)
+        for description in descriptions:
+            self.device_manager.add_description(description.strip())
+        self.device_manager.scan()
+
+        loaded_scpds = {}
+        for name, service in self.device_manager.services.items():
+            scpd = scpds.get(name)
+            if scpd is None:
+                scpd = self._get_content(service.SCPDURL)
+            # like Service.load_scpd, but from the already known content
+            service._scpd = Scpd(etree.fromstring(scpd.strip()))
+            loaded_scpds[name] = scpd
+        return loaded_scpds
+
+    def _get_content(self, path):
+        """Return the content of the given path of the box."""
+        return get_content_from(
+            f"{self.address}:{self.port}{path}",
+            timeout=self.timeout,
+            session=self.session,
+        )
+
+    @staticmethod
+    def _remove_outdated_cache_files(cache_dir, serial, cache_file):
+        """Remove cache files of former software versions of the box."""
+        try:
+            for file_name in os.listdir(cache_dir):
+                path = os.path.join(cache_dir, file_name)
+                if file_name.startswith(f"{serial}_") and path != cache_file:
+                    os.remove(path)
+        except OSError:
+            pass
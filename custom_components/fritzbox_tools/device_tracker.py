@@ -0,0 +1,208 @@
+"""AVM Fritz!Box device tracker for the hosts of the network."""
+import logging
+
+from homeassistant.components.device_tracker import SOURCE_TYPE_ROUTER
+from homeassistant.components.device_tracker.config_entry import ScannerEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+)
+from homeassistant.helpers.typing import HomeAssistantType
+
+from .const import DATA_FRITZ_TOOLS_INSTANCE, DOMAIN, SOURCE_HOSTS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def signal_host_update(fritzbox_tools, mac):
+    """Return the dispatcher signal for changes of a host."""
+    return f"{DOMAIN}_host_update_{fritzbox_tools.unique_id}_{mac}"
+
+
+def signal_hosts_available(fritzbox_tools):
+    """Return the dispatcher signal for the availability of the host list."""
+    return f"{DOMAIN}_hosts_available_{fritzbox_tools.unique_id}"
+
+
+def diff_hosts(known_hosts, new_hosts):
+    """Return the MAC addresses of the added, updated and removed hosts.
+
+    Removed are the hosts which are not in the new list anymore but were connected.
+    """
+    added = [mac for mac in new_hosts if mac not in known_hosts]
+    updated = [
+        mac
+        for mac, host in new_hosts.items()
+        if mac in known_hosts and known_hosts[mac] != host
+    ]
+    removed = [
+        mac
+        for mac, host in known_hosts.items()
+        if mac not in new_hosts and host["is_connected"]
+    ]
+    return added, updated, removed
+
+
+async def async_setup_entry(
+    hass: HomeAssistantType, entry: ConfigEntry, async_add_entities
+) -> None:
+    """Set up entry."""
+    _LOGGER.debug("Setting up device trackers")
+    fritzbox_tools = hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE][entry.entry_id]
+    coordinator = fritzbox_tools.coordinator
+
+    if SOURCE_HOSTS not in coordinator.sources:
+        return True
+
+    # only this listener is called for every refresh of the coordinator, the trackers
+    # get events for their own host only if it was added, changed or removed
+    known_hosts = {}  # MAC address -> last data sent to its tracker
+    last = {"data": None, "available": True}
+
+    @callback
+    def _async_handle_hosts_update():
+        """Diff a new host list with the last one and send the changes to the trackers."""
+        data = coordinator.get_source_data(SOURCE_HOSTS)
+        available = data is not None
+        if available != last["available"]:
+            last["available"] = available
+            async_dispatcher_send(
+                hass, signal_hosts_available(fritzbox_tools), available
+            )
+        if data is None or data is last["data"]:
+            return
+
+        added, updated, removed = diff_hosts(known_hosts, data)
+        last["data"] = data
+        known_hosts.update(data)
+        _LOGGER.debug(
+            f"Hosts of {fritzbox_tools.host}: {len(added)} added, "
+            f"{len(updated)} updated, {len(removed)} removed"
+        )
+        for mac in updated:
+            async_dispatcher_send(hass, signal_host_update(fritzbox_tools, mac), data[mac])
+        for mac in removed:
+            # a host removed from the list of the box is not connected anymore
+            host = {**known_hosts[mac], "is_connected": False}
+            known_hosts[mac] = host
+            async_dispatcher_send(hass, signal_host_update(fritzbox_tools, mac), host)
+        if added:
+            async_add_entities(
+                [FritzBoxTracker(fritzbox_tools, mac, data[mac]) for mac in added]
+            )
+
+    # removed when the box is unloaded
+    fritzbox_tools.unload_callbacks.append(
+        coordinator.async_add_listener(_async_handle_hosts_update)
+    )
+    _async_handle_hosts_update()
+
+    return True
+
+
+class FritzBoxTracker(ScannerEntity):
+    """Define a host in the network of the Fritzbox."""
+
+    def __init__(self, fritzbox_tools, mac, host):
+        """Init Fritzbox tracker."""
+        self.fritzbox_tools = fritzbox_tools
+        self.coordinator = fritzbox_tools.coordinator
+        self._mac = mac
+        self._name = host["hostname"] or mac
+        self._host = host
+        self._is_available = True
+
+    @property
+    def name(self):
+        """Return name."""
+        return self._name
+
+    @property
+    def unique_id(self):
+        """Return unique id."""
+        return f"{self.fritzbox_tools.unique_id}-tracker-{self._mac}"
+
+    @property
+    def device_info(self):
+        """Return device info."""
+        return self.fritzbox_tools.device_info
+
+    @property
+    def should_poll(self) -> bool:
+        """No polling needed, the changes of the host are sent to the entity."""
+        return False
+
+    @property
+    def entity_registry_enabled_default(self) -> bool:
+        """Return False, a network easily has hundreds of hosts."""
+        return False
+
+    @property
+    def available(self) -> bool:
+        """Return availability."""
+        return self._is_available
+
+    @property
+    def source_type(self) -> str:
+        """Return tracker source type."""
+        return SOURCE_TYPE_ROUTER
+
+    @property
+    def is_connected(self) -> bool:
+        """Return True if the host is active."""
+        return self._host["is_connected"]
+
+    @property
+    def ip_address(self):
+        """Return the ip address of the host."""
+        return self._host["ip_address"]
+
+    @property
+    def mac_address(self):
+        """Return the mac address of the host."""
+        return self._mac
+
+    @property
+    def hostname(self):
+        """Return the hostname of the host."""
+        return self._host["hostname"]
+
+    @property
+    def icon(self):
+        """Return icon."""
+        return "mdi:lan-connect" if self.is_connected else "mdi:lan-disconnect"
+
+    async def async_added_to_hass(self):
+        """Subscribe to the changes of the host."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                signal_host_update(self.fritzbox_tools, self._mac),
+                self._async_handle_host_update,
+            )
+        )
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                signal_hosts_available(self.fritzbox_tools),
+                self._async_handle_available,
+            )
+        )
+
+    async def async_update(self):
+        """Update the entity on request."""
+        await self.coordinator.async_request_refresh()
+
+    @callback
+    def _async_handle_host_update(self, host):
+        """Apply the new data of the host."""
+        self._host = host
+        self.async_write_ha_state()
+
+    @callback
+    def _async_handle_available(self, available):
+        """Apply the availability of the host list."""
+        self._is_available = available
+        self.async_write_ha_state()
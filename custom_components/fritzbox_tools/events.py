@@ -0,0 +1,213 @@
+"""UPnP GENA event subscriptions which push state changes of the FRITZ!Box."""
+import asyncio
+import logging
+import re
+import socket
+from xml.etree import ElementTree as etree
+
+import aiohttp
+from aiohttp import web
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+SUBSCRIPTION_TIMEOUT = 1800  # seconds, requested from the box
+MIN_RENEW_INTERVAL = 60  # seconds
+EVENT_NAMESPACE = "urn:schemas-upnp-org:event-1-0"
+TIMEOUT_REGEX = re.compile(r"Second-(\d+)", re.IGNORECASE)
+
+
+def _get_local_ip(host, port):
+    """Return the local address used to reach the box. Performs sync I/O (name resolution)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.connect((host, port))
+        return sock.getsockname()[0]
+
+
+def parse_propertyset(content):
+    """Return the variables of a GENA propertyset as dict."""
+    variables = {}
+    for prop in etree.fromstring(content).iter(f"{{{EVENT_NAMESPACE}}}property"):
+        for node in prop:
+            variables[node.tag.rpartition("}")[2]] = node.text or ""
+    return variables
+
+
+class FritzBoxEventListener:
+    """Subscribe to the events of the services of all data sources and push them into the coordinator.
+
+    The box sends NOTIFY requests to a small http server on an ephemeral port. Subscriptions are
+    renewed before they expire and subscribed again if the box forgot them (e.g. after a reboot).
+    Services which could not be subscribed are tried again with every renewal. Sources with
+    active subscriptions to all of their event services are polled only as a slow fallback.
+    """
+
+    def __init__(self, fritzbox_tools):
+        """Init event listener."""
+        self.fritzbox_tools = fritzbox_tools
+        self._runner = None
+        self._callback_url = None
+        self._services = {}  # service name -> source name
+        self._subscriptions = {}  # sid -> service name
+        self._unsubscribed = set()  # service names, subscribed again with every renewal
+        self._timeout = SUBSCRIPTION_TIMEOUT
+        self._renew_task = None
+
+    @property
+    def subscriptions(self):
+        """Return the subscribed services by sid."""
+        return dict(self._subscriptions)
+
+    async def async_start(self):
+        """Start the http server and subscribe to all event services of the sources."""
+        fritzbox_tools = self.fritzbox_tools
+        services = fritzbox_tools.connection.services
+        self._services = {
+            service_name: source.name
+            for source in fritzbox_tools.coordinator.sources.values()
+            for service_name in source.event_services
+            if service_name in services and services[service_name].eventSubURL
+        }
+        if not self._services:
+            return
+
+        local_ip = await fritzbox_tools.executor.async_run(
+            _get_local_ip, fritzbox_tools.host, fritzbox_tools.port
+        )
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("", 0))
+        app = web.Application()
+        app.router.add_route("*", f"/{DOMAIN}/notify", self._async_handle_notify)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.SockSite(self._runner, sock).start()
+        self._callback_url = f"http://{local_ip}:{sock.getsockname()[1]}/{DOMAIN}/notify"
+        _LOGGER.debug(f"Listening for events of the FRITZ!Box on {self._callback_url}")
+
+        await asyncio.gather(
+            *(self._async_subscribe(service_name) for service_name in self._services)
+        )
+        if not self._subscriptions:
+            _LOGGER.info("The FRITZ!Box does not send events, polling all states")
+            await self.async_stop()
+            return
+        self._unsubscribed = set(self._services) - set(self._subscriptions.values())
+        self._renew_task = fritzbox_tools.hass.async_create_task(self._async_renew())
+
+    async def async_stop(self):
+        """Cancel all subscriptions and stop the http server."""
+        if self._renew_task is not None:
+            self._renew_task.cancel()
+            self._renew_task = None
+        for sid, service_name in list(self._subscriptions.items()):
+            try:
+                await self._async_request(
+                    "UNSUBSCRIBE", service_name, {"SID": sid}
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+        self._subscriptions = {}
+        self._unsubscribed = set()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _async_request(self, method, service_name, headers):
+        """Send a GENA request for a service, return the response."""
+        connection = self.fritzbox_tools.async_connection
+        service = self.fritzbox_tools.connection.services[service_name]
+        async with connection.session.request(
+            method,
+            connection.url + service.eventSubURL,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=10),
+        ) as response:
+            await response.read()
+            return response
+
+    async def _async_subscribe(self, service_name, sid=None):
+        """Subscribe to a service or renew the subscription `sid`. Returns True on success."""
+        headers = {"TIMEOUT": f"Second-{SUBSCRIPTION_TIMEOUT}"}
+        if sid is None:
+            headers.update({"CALLBACK": f"<{self._callback_url}>", "NT": "upnp:event"})
+        else:
+            headers["SID"] = sid
+        try:
+            response = await self._async_request("SUBSCRIBE", service_name, headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            _LOGGER.debug(f"Could not subscribe to {service_name}", exc_info=True)
+            return False
+        if response.status != 200 or "SID" not in response.headers:
+            _LOGGER.debug(f"Could not subscribe to {service_name}: {response.status}")
+            return False
+
+        if sid is None:
+            self._subscriptions[response.headers["SID"]] = service_name
+            self._update_push_source(self._services[service_name])
+        match = TIMEOUT_REGEX.match(response.headers.get("TIMEOUT", ""))
+        if match:
+            self._timeout = min(self._timeout, int(match.group(1)))
+        return True
+
+    async def _async_renew(self):
+        """Renew all subscriptions before they expire, subscribe to the unsubscribed services again."""
+        while True:
+            await asyncio.sleep(max(self._timeout // 2, MIN_RENEW_INTERVAL))
+            for service_name in list(self._unsubscribed):
+                # a successful subscription restores the push mode of the source
+                if await self._async_subscribe(service_name):
+                    self._unsubscribed.discard(service_name)
+                    _LOGGER.info(f"Receiving the events of {service_name} again")
+            for sid, service_name in list(self._subscriptions.items()):
+                if await self._async_subscribe(service_name, sid):
+                    continue
+                # the box lost the subscription, e.g. after a reboot
+                del self._subscriptions[sid]
+                if not await self._async_subscribe(service_name):
+                    self._unsubscribed.add(service_name)
+                    _LOGGER.warning(
+                        f"Lost the event subscription of {service_name}, polling it until "
+                        "it is subscribed again"
+                    )
+                    if self._update_push_source(self._services[service_name]) is False:
+                        await self.fritzbox_tools.coordinator.async_request_refresh()
+
+    def _update_push_source(self, source_name):
+        """Mark a source as push-driven while all of its event services are subscribed.
+
+        Returns the new state if it changed, None otherwise.
+        """
+        subscribed = set(self._subscriptions.values())
+        push = all(
+            service_name in subscribed
+            for service_name, name in self._services.items()
+            if name == source_name
+        )
+        coordinator = self.fritzbox_tools.coordinator
+        if push == (source_name in coordinator.push_sources):
+            return None
+        coordinator.set_push_source(source_name, push)
+        return push
+
+    async def _async_handle_notify(self, request):
+        """Handle a NOTIFY request of the box."""
+        if request.method != "NOTIFY":
+            return web.Response(status=405)
+        service_name = self._subscriptions.get(request.headers.get("SID"))
+        content = await request.read()
+        if service_name is None:
+            # e.g. the initial event, which may arrive before the SUBSCRIBE response
+            return web.Response(status=200)
+        try:
+            variables = parse_propertyset(content)
+        except etree.ParseError:
+            _LOGGER.debug(f"Invalid event of {service_name}: {content}")
+            return web.Response(status=400)
+
+        _LOGGER.debug(f"Event of {service_name}: {variables}")
+        self.fritzbox_tools.coordinator.async_push_event(
+            self._services[service_name], service_name, variables
+        )
+        return web.Response(status=200)
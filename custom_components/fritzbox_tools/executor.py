@@ -0,0 +1,133 @@
+"""Bounded thread pool per FRITZ!Box for the blocking I/O to it."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+
+from .const import DATA_FRITZ_TOOLS_EXECUTOR
+
+_LOGGER = logging.getLogger(__name__)
+
+# per box, a slow box never holds more threads than this
+MAX_WORKERS = 4
+# jobs waiting for a worker before a warning is logged
+BACKLOG_WARNING = 8
+
+
+class FritzBoxExecutor:
+    """Run the blocking calls of one box in a small pool of its own.
+
+    Neither the shared executor of Home Assistant nor the pools of the other boxes are used,
+    so a slow or unreachable box only delays its own jobs. Counts the waiting and running
+    jobs and how long jobs waited for a worker, so a building backlog is visible in the call
+    statistics.
+    """
+
+    def __init__(self, host, max_workers=MAX_WORKERS):
+        """Init executor."""
+        self.host = host
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"fritzbox_tools_{host}"
+        )
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.jobs = 0
+        self.total_wait = 0.0  # seconds
+        self.max_wait = 0.0  # seconds
+        self._warned = False
+
+    async def async_run(self, func, *args):
+        """Run `func(*args)` in a worker and return its result."""
+        job = self._enqueue()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._run, job, func, args
+            )
+        except asyncio.CancelledError:
+            # a job cancelled before a worker picked it up never runs
+            with self._lock:
+                self._dequeue(job)
+            raise
+
+    def submit(self, func, *args):
+        """Run `func(*args)` in a worker and return its concurrent future, for the sync code of a job.
+
+        A job waiting for the future holds a worker itself, so it must not submit more than one.
+        """
+        job = self._enqueue()
+        return self._executor.submit(self._run, job, func, args)
+
+    def _enqueue(self):
+        """Count a new job as waiting and return it."""
+        job = {"submitted": time.monotonic(), "dequeued": False}
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            backlog = self.queued
+        if backlog >= BACKLOG_WARNING and not self._warned:
+            self._warned = True
+            _LOGGER.warning(
+                f"{backlog} blocking calls are waiting for the {self.max_workers} workers of "
+                f"the FRITZ!Box {self.host}, it answers slowly"
+            )
+        return job
+
+    def _dequeue(self, job):
+        """Remove a job from the queue count once. Call with the lock held."""
+        if not job["dequeued"]:
+            job["dequeued"] = True
+            self.queued -= 1
+
+    def _run(self, job, func, args):
+        wait = time.monotonic() - job["submitted"]
+        with self._lock:
+            self._dequeue(job)
+            self.running += 1
+            self.jobs += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if not self.queued:
+                self._warned = False
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    @property
+    def stats(self):
+        """Return the queue depth and the wait times of the jobs."""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "max_queued": self.max_queued,
+                "jobs": self.jobs,
+                "mean_wait_ms": round(self.total_wait * 1000 / self.jobs, 1) if self.jobs else None,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+            }
+
+    def shutdown(self):
+        """Stop the workers once the running jobs are done."""
+        self._executor.shutdown(wait=False)
+
+
+def get_executor(hass, host):
+    """Return the executor of a box, create it on first use."""
+    executors = hass.data.setdefault(DATA_FRITZ_TOOLS_EXECUTOR, {})
+    executor = executors.get(host)
+    if executor is None:
+        executor = executors[host] = FritzBoxExecutor(host)
+    return executor
+
+
+def shutdown_executor(hass, host):
+    """Shut the executor of a box down, e.g. when the box is unloaded."""
+    executor = hass.data.get(DATA_FRITZ_TOOLS_EXECUTOR, {}).pop(host, None)
+    if executor is not None:
+        executor.shutdown()
@@ -0,0 +1,76 @@
+"""Concurrency limit with priorities for the requests to a FRITZ!Box."""
+import asyncio
+from contextlib import asynccontextmanager
+import heapq
+import itertools
+
+PRIORITY_WRITE = 0
+PRIORITY_READ = 1
+
+# actions which change the box, sent before the polling reads
+WRITE_ACTION_PREFIXES = ("Set", "Add", "Delete", "Force", "Reboot", "X_AVM-DE_Set")
+
+
+def action_priority(action_name):
+    """Return the priority of a TR-064 action."""
+    if action_name.startswith(WRITE_ACTION_PREFIXES):
+        return PRIORITY_WRITE
+    return PRIORITY_READ
+
+
+class RequestGate:
+    """Limit the number of concurrent requests to a box.
+
+    Waiting requests get a free slot by priority (writes before reads) and in arrival order
+    within a priority, so a toggle does not queue behind a whole poll cycle.
+    """
+
+    def __init__(self, limit):
+        """Init gate with at most `limit` concurrent requests."""
+        self.limit = limit
+        self._active = 0
+        self._waiters = []  # heap of (priority, arrival, future)
+        self._arrival = itertools.count()
+
+    @property
+    def active(self):
+        """Return the number of running requests."""
+        return self._active
+
+    @property
+    def queued(self):
+        """Return the number of waiting requests."""
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    @asynccontextmanager
+    async def async_slot(self, priority=PRIORITY_READ):
+        """Wait for a free slot and hold it within the context."""
+        await self._async_acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _async_acquire(self, priority):
+        if self._active < self.limit and not self.queued:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrival), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was handed over right before the cancellation
+                self._release()
+            raise
+
+    def _release(self):
+        """Hand the slot over to the next waiting request or free it."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
@@ -0,0 +1,135 @@
+"""Streaming parser for the xml lists of the FRITZ!Box (deflections, hosts, calls, phonebooks)."""
+from xml.etree import ElementTree as etree
+
+CHUNK_SIZE = 16384  # fed at once by parse_list, so the tree never holds many records
+
+
+def to_bool(value):
+    """Convert a "0"/"1" value."""
+    return value == "1"
+
+
+def to_int(value):
+    """Convert an integer value, None for empty values."""
+    return int(value) if value else None
+
+
+class RecordType:
+    """Describes the records of a list: the tag of a record and the converters of its fields.
+
+    The fields of a record are the leaf elements below the record element, by local name.
+    Fields without a converter are kept as text (None if empty), fields in `repeated` are
+    collected into lists (e.g. the numbers of a phonebook contact).
+    """
+
+    def __init__(self, tag, converters=None, repeated=()):
+        """Init record type."""
+        self.tag = tag
+        self.converters = converters or {}
+        self.repeated = frozenset(repeated)
+
+
+DEFLECTION = RecordType("Item", {"DeflectionId": int, "Enable": to_bool})
+HOST = RecordType(
+    "Item",
+    {
+        "Index": int,
+        "Active": to_bool,
+        "X_AVM-DE_Port": to_int,
+        "X_AVM-DE_Speed": to_int,
+        "X_AVM-DE_Guest": to_bool,
+    },
+)
+# IGD 2 GetListOfPortMappings
+PORT_MAPPING = RecordType(
+    "PortMappingEntry",
+    {
+        "NewExternalPort": int,
+        "NewInternalPort": int,
+        "NewEnabled": to_bool,
+        "NewLeaseTime": to_int,
+    },
+)
+# the file of the path returned by X_AVM-DE_OnTel GetCallList
+CALL = RecordType("Call", {"Id": int, "Type": int, "Count": to_int, "Port": to_int})
+# the file of the url returned by X_AVM-DE_OnTel GetPhonebook
+CONTACT = RecordType(
+    "contact", {"uniqueid": to_int, "category": to_int}, repeated=("number", "email")
+)
+
+
+def _local_name(tag):
+    return tag.rpartition("}")[2]
+
+
+class ListParser:
+    """Incremental parser which returns the records of a list while it is fed.
+
+    Every record element is converted to a dict and removed from the tree as soon as it is
+    complete, so memory is bounded by the largest record instead of the whole list.
+    """
+
+    def __init__(self, record_type):
+        """Init parser."""
+        self.record_type = record_type
+        self._parser = etree.XMLPullParser(events=("start", "end"))
+        self._stack = []  # open elements
+
+    def feed(self, data):
+        """Feed a chunk of the list, return the records completed by it."""
+        self._parser.feed(data)
+        return self._read_records()
+
+    def close(self):
+        """Finish parsing, return the remaining records. Raises ParseError on incomplete lists."""
+        self._parser.close()
+        return self._read_records()
+
+    def _read_records(self):
+        records = []
+        tag = self.record_type.tag
+        for event, element in self._parser.read_events():
+            if event == "start":
+                self._stack.append(element)
+                continue
+            self._stack.pop()
+            if _local_name(element.tag) != tag:
+                continue
+            records.append(self._convert(element))
+            if self._stack:
+                self._stack[-1].remove(element)
+            element.clear()
+        return records
+
+    def _convert(self, element):
+        record_type = self.record_type
+        record = {}
+        for node in element.iter():
+            if node is element or len(node):
+                continue
+            name = _local_name(node.tag)
+            text = node.text.strip() if node.text else None
+            text = text or None
+            converter = record_type.converters.get(name)
+            if converter is not None:
+                try:
+                    text = converter(text)
+                except (TypeError, ValueError):
+                    pass  # keep malformed values as text, like fritzconnection
+            if name in record_type.repeated:
+                record.setdefault(name, []).append(text)
+            elif name not in record:
+                record[name] = text
+        return record
+
+
+def parse_list(content, record_type):
+    """Return the records of a complete list payload (str or bytes)."""
+    parser = ListParser(record_type)
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    records = []
+    for offset in range(0, len(content), CHUNK_SIZE):
+        records.extend(parser.feed(content[offset:offset + CHUNK_SIZE]))
+    records.extend(parser.close())
+    return records
@@ -0,0 +1,178 @@
+"""Access profiles of the FRITZ!Box web interface with one shared login."""
+import hashlib
+import logging
+import threading
+
+import requests
+
+_LOGGER = logging.getLogger(__name__)
+
+EMPTY_SID = "0000000000000000"
+TIMEOUT = 30  # seconds
+
+STATE_UNLIMITED = "unlimited"
+STATE_NEVER = "never"
+STATE_LIMITED = "limited"
+
+# online time column of the profile overview, in the languages of the web interface
+OVERVIEW_STATES = {
+    "unbegrenzt": STATE_UNLIMITED,
+    "unlimited": STATE_UNLIMITED,
+    "gesperrt": STATE_NEVER,
+    "blocked": STATE_NEVER,
+    "never": STATE_NEVER,
+}
+
+
+class FritzProfileSession:
+    """Read and switch the online time of access profiles.
+
+    All profiles share one session id (SID), which is only renewed if the box rejects it.
+    The states of all profiles are read from the profile overview with a single request;
+    only profiles without an online time column there (older FRITZ!OS) fall back to their
+    edit page. All methods perform sync I/O.
+    """
+
+    def __init__(self, host, username, password):
+        """Init session, log in and read the profile ids."""
+        self.url = host if "://" in host else f"http://{host}"
+        self._username = username
+        self._password = password
+        self._session = requests.Session()
+        self._login_lock = threading.Lock()
+        self.sid = EMPTY_SID
+        self.login()
+        self.profile_ids = {
+            name: profile_id for name, (profile_id, _) in self._get_overview().items()
+        }
+
+    def _get_sid_challenge(self, params=None):
+        # pylint: disable=import-error
+        import lxml.etree
+
+        response = self._session.get(
+            self.url + "/login_sid.lua", params=params, timeout=TIMEOUT
+        )
+        data = lxml.etree.fromstring(
+            response.content, parser=lxml.etree.XMLParser(recover=True)
+        )
+        return (
+            data.xpath("//SessionInfo/SID/text()")[0],
+            data.xpath("//SessionInfo/Challenge/text()")[0],
+        )
+
+    def login(self, rejected_sid=None):
+        """Log in and store the new SID, unless another thread already replaced `rejected_sid`."""
+        with self._login_lock:
+            if rejected_sid is not None and self.sid != rejected_sid:
+                return
+            _LOGGER.debug(f"Logging in to the web interface of {self.url}")
+            sid, challenge = self._get_sid_challenge()
+            if sid == EMPTY_SID:
+                md5 = hashlib.md5(
+                    f"{challenge}-{self._password}".encode("utf-16le")
+                ).hexdigest()
+                sid, _ = self._get_sid_challenge(
+                    {"username": self._username, "response": f"{challenge}-{md5}"}
+                )
+            if sid == EMPTY_SID:
+                raise PermissionError(
+                    f"Cannot login to {self.url} using the supplied credentials. "
+                    "Only works if login via user and password is enabled in the FRITZ!Box"
+                )
+            self.sid = sid
+
+    def _post(self, data):
+        """Post to data.lua with the shared SID, log in again once if it was rejected."""
+        sid = self.sid
+        response = self._session.post(
+            self.url + "/data.lua", data={"sid": sid, **data}, timeout=TIMEOUT
+        )
+        if response.status_code != 200:
+            self.login(rejected_sid=sid)
+            response = self._session.post(
+                self.url + "/data.lua", data={"sid": self.sid, **data}, timeout=TIMEOUT
+            )
+        response.raise_for_status()
+        return response.text
+
+    def _get_overview(self):
+        """Return the id and the overview state (or None) of every profile by name."""
+        # pylint: disable=import-error
+        import lxml.html
+
+        html = lxml.html.fromstring(
+            self._post({"xhr": 1, "no_sidrenew": "", "page": "kidPro"})
+        )
+        profiles = {}
+        for row in html.xpath('//table[@id="uiProfileList"]/tr'):
+            name = row.xpath('td[@class="name"]/span/text()')
+            profile_id = row.xpath('td[@class="btncolumn"]/button[@name="edit"]/@value')
+            if not name or not profile_id:
+                continue
+            online_time = "".join(row.xpath('td[@class="time"]//text()')).strip().lower()
+            state = OVERVIEW_STATES.get(
+                online_time, STATE_LIMITED if online_time else None
+            )
+            profiles[name[0]] = (profile_id[0], state)
+        return profiles
+
+    def get_profile_id(self, profile):
+        """Return the id of a profile, raise AttributeError if the box does not know it."""
+        try:
+            return self.profile_ids[profile]
+        except KeyError:
+            raise AttributeError(
+                f"The specified profile {profile} does not exist. Please check the spelling."
+            ) from None
+
+    def get_state(self, profile):
+        """Return the state of a profile from its edit page."""
+        # pylint: disable=import-error
+        import lxml.html
+
+        html = lxml.html.fromstring(
+            self._post(
+                {"edit": self.get_profile_id(profile), "page": "kids_profileedit"}
+            )
+        )
+        return html.xpath(
+            '//div[@class="time_ctrl_options"]/input[@checked="checked"]/@value'
+        )[0]
+
+    def get_states(self, profiles):
+        """Return the states of the given profiles by name, None for profiles which could not be read."""
+        overview = self._get_overview()
+        states = {}
+        for profile in profiles:
+            if profile not in overview:
+                _LOGGER.error(f"The profile {profile} does not exist anymore")
+                states[profile] = None
+                continue
+            profile_id, state = overview[profile]
+            self.profile_ids[profile] = profile_id
+            if state is None:
+                try:
+                    state = self.get_state(profile)
+                except (requests.RequestException, IndexError):
+                    _LOGGER.error(
+                        f"Could not get state of profile {profile}", exc_info=True
+                    )
+            states[profile] = state
+        return states
+
+    def set_state(self, profile, state):
+        """Set the online time of a profile to `state` (unlimited or never)."""
+        self._post(
+            {
+                "edit": self.get_profile_id(profile),
+                "time": state,
+                "budget": "unlimited",
+                "apply": "",
+                "page": "kids_profileedit",
+            }
+        )
+
+    def close(self):
+        """Close the connections to the box."""
+        self._session.close()
@@ -0,0 +1,276 @@
+"""AVM Fritz!Box traffic and call monitor sensors."""
+from abc import abstractmethod
+import logging
+
+try:
+    from homeassistant.components.sensor import ENTITY_ID_FORMAT, SensorEntity
+except ImportError:
+    from homeassistant.components.sensor import ENTITY_ID_FORMAT
+    from homeassistant.helpers.entity import Entity as SensorEntity
+
+try:
+    from homeassistant.components.sensor import STATE_CLASS_MEASUREMENT
+except ImportError:
+    STATE_CLASS_MEASUREMENT = None
+
+try:
+    from homeassistant.components.sensor import STATE_CLASS_TOTAL_INCREASING
+except ImportError:
+    STATE_CLASS_TOTAL_INCREASING = STATE_CLASS_MEASUREMENT
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import DATA_GIGABYTES, DATA_RATE_KILOBYTES_PER_SECOND
+from homeassistant.core import callback
+from homeassistant.helpers.typing import HomeAssistantType
+
+from .callmonitor import (
+    CALL_TYPE_CALL,
+    CALL_TYPE_CONNECT,
+    CALL_TYPE_DISCONNECT,
+    CALL_TYPE_RING,
+)
+from .const import DATA_FRITZ_TOOLS_INSTANCE, DOMAIN
+from .traffic import TrafficSampler
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistantType, entry: ConfigEntry, async_add_entities
+) -> None:
+    """Set up entry."""
+    _LOGGER.debug("Setting up traffic and call monitor sensors")
+    fritzbox_tools = hass.data[DOMAIN][DATA_FRITZ_TOOLS_INSTANCE][entry.entry_id]
+
+    services = fritzbox_tools.connection.services
+    entities = []
+    if (
+        "WANCommonIFC1" in services
+        and "GetAddonInfos" in services["WANCommonIFC1"].actions
+    ):
+        # the sensors are disabled by default, the sampler runs only while one is enabled
+        sampler = TrafficSampler(fritzbox_tools)
+        entities += [
+            FritzBoxRateSensor(fritzbox_tools, sampler, "received", "Download rate"),
+            FritzBoxRateSensor(fritzbox_tools, sampler, "sent", "Upload rate"),
+            FritzBoxTotalSensor(fritzbox_tools, sampler, "received", "GB received"),
+            FritzBoxTotalSensor(fritzbox_tools, sampler, "sent", "GB sent"),
+        ]
+
+    if fritzbox_tools.call_monitor is not None:
+        entities.append(
+            FritzBoxCallMonitorSensor(fritzbox_tools, fritzbox_tools.call_monitor)
+        )
+
+    async_add_entities(entities)
+    return True
+
+
+class FritzBoxTrafficSensor(SensorEntity):
+    """Base class of the sensors which are updated by the traffic sampler."""
+
+    def __init__(self, fritzbox_tools, sampler, direction, name):
+        """Init traffic sensor."""
+        self.fritzbox_tools = fritzbox_tools
+        self.sampler = sampler
+        self._direction = direction
+        self._name = f"FRITZ!Box {name}"
+        id = f"fritzbox_{self.fritzbox_tools.fritzbox_model}_{name}"
+        self.entity_id = ENTITY_ID_FORMAT.format(id.lower().replace(" ", "_"))
+        self._state = None
+        self._attributes = {}
+        super().__init__()
+
+    @property
+    def name(self):
+        """Return name."""
+        return self._name
+
+    @property
+    def unique_id(self):
+        """Return unique id."""
+        return f"{self.fritzbox_tools.unique_id}-{self.entity_id}"
+
+    @property
+    def device_info(self):
+        """Return device info."""
+        return self.fritzbox_tools.device_info
+
+    @property
+    def should_poll(self) -> bool:
+        """No polling needed, the sampler publishes the values."""
+        return False
+
+    @property
+    def entity_registry_enabled_default(self) -> bool:
+        """Return False, the rates need a request to the box every second."""
+        return False
+
+    @property
+    def available(self) -> bool:
+        """Return availability."""
+        return self._state is not None
+
+    @property
+    def state(self):
+        """Return the state."""
+        return self._state
+
+    @property
+    def device_state_attributes(self) -> dict:
+        """Return device attributes."""
+        return self._attributes
+
+    needs_rates = False
+
+    async def async_added_to_hass(self):
+        """Subscribe to the published values of the sampler."""
+        self.async_on_remove(
+            self.sampler.async_add_listener(self._handle_publish, rates=self.needs_rates)
+        )
+
+    @callback
+    def _handle_publish(self):
+        """Apply the values of the last publish interval."""
+        self._update_from_data(self.sampler.data)
+        self.async_write_ha_state()
+
+    @abstractmethod
+    def _update_from_data(self, data):
+        """Update the state from the published data, which is None without samples."""
+
+
+class FritzBoxRateSensor(FritzBoxTrafficSensor):
+    """Mean rate of the last publish interval, with its peak as attribute."""
+
+    unit_of_measurement = DATA_RATE_KILOBYTES_PER_SECOND
+    state_class = STATE_CLASS_MEASUREMENT
+    needs_rates = True
+
+    @property
+    def icon(self):
+        """Return icon."""
+        return "mdi:download-network" if self._direction == "received" else "mdi:upload-network"
+
+    def _update_from_data(self, data):
+        """Update state from the rates."""
+        if data is None or self._direction not in data:
+            self._state = None
+            return
+        self._state = round(data[self._direction] / 1000, 1)
+        self._attributes["peak"] = round(data[f"peak_{self._direction}"] / 1000, 1)
+
+
+class FritzBoxTotalSensor(FritzBoxTrafficSensor):
+    """Total bytes of the WAN interface since the last reconnect."""
+
+    unit_of_measurement = DATA_GIGABYTES
+    # the counters start over when the box reconnects
+    state_class = STATE_CLASS_TOTAL_INCREASING
+
+    @property
+    def icon(self):
+        """Return icon."""
+        return "mdi:download" if self._direction == "received" else "mdi:upload"
+
+    def _update_from_data(self, data):
+        """Update state from the byte counters."""
+        if data is None:
+            self._state = None
+            return
+        self._state = round(data[f"total_{self._direction}"] / 1e9, 2)
+
+
+CALL_STATE_IDLE = "idle"
+CALL_STATE_RINGING = "ringing"
+CALL_STATE_DIALING = "dialing"
+CALL_STATE_TALKING = "talking"
+
+CALL_STATES = {
+    CALL_TYPE_RING: CALL_STATE_RINGING,
+    CALL_TYPE_CALL: CALL_STATE_DIALING,
+    CALL_TYPE_CONNECT: CALL_STATE_TALKING,
+}
+
+
+class FritzBoxCallMonitorSensor(SensorEntity):
+    """State of the telephone lines, updated by the events of the call monitor.
+
+    Parallel calls are tracked by their connection id, the state is the one of the last
+    event of a call which is still active.
+    """
+
+    def __init__(self, fritzbox_tools, call_monitor):
+        """Init call monitor sensor."""
+        self.fritzbox_tools = fritzbox_tools
+        self.call_monitor = call_monitor
+        self._name = "FRITZ!Box Call monitor"
+        id = f"fritzbox_{self.fritzbox_tools.fritzbox_model}_call_monitor"
+        self.entity_id = ENTITY_ID_FORMAT.format(id.lower().replace(" ", "_"))
+        self._calls = {}  # connection id -> state
+        self._attributes = {}
+        super().__init__()
+
+    @property
+    def name(self):
+        """Return name."""
+        return self._name
+
+    @property
+    def unique_id(self):
+        """Return unique id."""
+        return f"{self.fritzbox_tools.unique_id}-{self.entity_id}"
+
+    @property
+    def device_info(self):
+        """Return device info."""
+        return self.fritzbox_tools.device_info
+
+    @property
+    def icon(self):
+        """Return icon."""
+        return "mdi:phone" if self._calls else "mdi:phone-hangup"
+
+    @property
+    def should_poll(self) -> bool:
+        """No polling needed, the call monitor pushes the events."""
+        return False
+
+    @property
+    def available(self) -> bool:
+        """Return availability."""
+        return self.call_monitor.connected
+
+    @property
+    def state(self):
+        """Return the state."""
+        if not self._calls:
+            return CALL_STATE_IDLE
+        return next(reversed(self._calls.values()))
+
+    @property
+    def device_state_attributes(self) -> dict:
+        """Return device attributes."""
+        return self._attributes
+
+    async def async_added_to_hass(self):
+        """Subscribe to the events of the call monitor."""
+        self.async_on_remove(self.call_monitor.async_add_listener(self._handle_event))
+
+    @callback
+    def _handle_event(self, event):
+        """Apply a call event, None if the connection to the call monitor changed."""
+        if event is None:
+            if not self.call_monitor.connected:
+                # the calls of a lost connection never end
+                self._calls.clear()
+            self.async_write_ha_state()
+            return
+
+        connection_id = event["connection_id"]
+        if event["type"] == CALL_TYPE_DISCONNECT:
+            self._calls.pop(connection_id, None)
+        else:
+            self._calls.pop(connection_id, None)
+            self._calls[connection_id] = CALL_STATES[event["type"]]
+        self._attributes = dict(event)  # the last event
+        self.async_write_ha_state()
@@ -0,0 +1,427 @@
+"""Data sources polled by the FRITZ!Box Tools update coordinator."""
+from abc import ABC, abstractmethod
+import asyncio
+import datetime
+import logging
+
+from .const import (
+    SOURCE_CONNECTIVITY,
+    SOURCE_DEFLECTIONS,
+    SOURCE_HOSTS,
+    SOURCE_PORT_MAPPINGS,
+    SOURCE_PROFILES,
+    SOURCE_WIFI,
+)
+from .lists import DEFLECTION, HOST, PORT_MAPPING, parse_list
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class FritzBoxDataSource(ABC):
+    """Base class for router data which is fetched once per cycle and shared by all entities."""
+
+    name = None
+    # default interval, the coordinator adapts it between the min and max interval
+    update_interval = datetime.timedelta(seconds=30)
+    min_update_interval = datetime.timedelta(seconds=10)
+    max_update_interval = datetime.timedelta(minutes=5)
+
+    def __init__(self, fritzbox_tools):
+        """Init data source."""
+        self.fritzbox_tools = fritzbox_tools
+
+    @abstractmethod
+    async def async_fetch(self):
+        """Fetch the data from the router and return it, raise on errors."""
+
+    def has_changed(self, old_data, new_data):
+        """Return True if the new data differs from the data of the last fetch."""
+        return old_data != new_data
+
+    @property
+    def event_services(self):
+        """Return the services whose events change the data of this source."""
+        return []
+
+    def apply_event(self, data, service_name, variables):
+        """Return the data updated with the evented variables of a service or None to fetch it again."""
+        return None
+
+
+class WifiSource(FritzBoxDataSource):
+    """GetInfo of all WLANConfiguration services."""
+
+    name = SOURCE_WIFI
+
+    @property
+    def networks(self):
+        """Return the network numbers of the box with their names."""
+        services = self.fritzbox_tools.connection.services
+        if "WLANConfiguration4" in services:
+            # todo: come up with better names!
+            return {
+                "1": "Wifi",
+                "2": "Wifi (5GHz)",
+                "3": "Wifi (5GHz) - 2",
+                "4": "Guest Wifi",
+            }
+        if "WLANConfiguration3" in services:
+            return {"1": "Wifi", "2": "Wifi (5GHz)", "3": "Guest Wifi"}
+        return {"1": "Wifi", "2": "Guest Wifi"}
+
+    @property
+    def event_services(self):
+        """Return the WLANConfiguration services."""
+        return [f"WLANConfiguration{network_num}" for network_num in self.networks]
+
+    def apply_event(self, data, service_name, variables):
+        """Apply the Enable variable of a WLANConfiguration event."""
+        if set(variables) - {"Enable", "Status"}:
+            return None
+        network_num = service_name[len("WLANConfiguration"):]
+        wifi_info = dict(data[network_num])
+        if "Enable" in variables:
+            wifi_info["NewEnable"] = variables["Enable"] == "1"
+        if "Status" in variables:
+            wifi_info["NewStatus"] = variables["Status"]
+        return {**data, network_num: wifi_info}
+
+    async def async_fetch(self):
+        """Fetch the wifi info of every network."""
+        return {
+            network_num: await self.fritzbox_tools.async_call_action(
+                f"WLANConfiguration:{network_num}", "GetInfo"
+            )
+            for network_num in self.networks
+        }
+
+
+class PortMappingTable:
+    """Snapshot of the whole port mapping table, indexed by (external port, protocol) and by index."""
+
+    def __init__(self, entries):
+        """Init table from a dict of index -> entry as it comes from fritzconnection."""
+        self.by_index = entries
+        self.by_key = {self.key(entry): idx for idx, entry in entries.items()}
+
+    @staticmethod
+    def key(port_mapping):
+        """Return the (external port, protocol) key of an entry."""
+        return port_mapping["NewExternalPort"], port_mapping["NewProtocol"]
+
+    def get(self, key):
+        """Return the entry with the given (external port, protocol) key or None."""
+        idx = self.by_key.get(key)
+        if idx is None:
+            return None
+        return self.by_index[idx]
+
+    def __eq__(self, other):
+        """Compare the entries of two tables."""
+        if not isinstance(other, PortMappingTable):
+            return NotImplemented
+        return self.by_index == other.by_index
+
+    def __iter__(self):
+        """Iterate over all entries in index order."""
+        return iter(self.by_index.values())
+
+    def __len__(self):
+        """Return number of entries."""
+        return len(self.by_index)
+
+
+# fields of the IGD 2 port listing -> argument names of GetGenericPortMappingEntry
+LISTING_FIELDS = {
+    "NewRemoteHost": "NewRemoteHost",
+    "NewExternalPort": "NewExternalPort",
+    "NewProtocol": "NewProtocol",
+    "NewInternalPort": "NewInternalPort",
+    "NewInternalClient": "NewInternalClient",
+    "NewEnabled": "NewEnabled",
+    "NewDescription": "NewPortMappingDescription",
+    "NewLeaseTime": "NewLeaseDuration",
+}
+LISTING_PROTOCOLS = ("TCP", "UDP")
+
+
+class PortMappingSource(FritzBoxDataSource):
+    """Port mapping table of the default connection, downloaded once per cycle.
+
+    Boxes whose connection service offers the IGD 2 GetListOfPortMappings return the whole
+    table with one request per protocol, otherwise the entries are requested concurrently
+    through the request gate.
+    """
+
+    name = SOURCE_PORT_MAPPINGS
+
+    def __init__(self, fritzbox_tools):
+        """Init port mapping source."""
+        super().__init__(fritzbox_tools)
+        self._connection_type = None
+
+    @property
+    def connection_type(self):
+        """Return the default connection service, e.g. WANPPPConnection:1. Known after the first fetch."""
+        return self._connection_type
+
+    async def async_fetch(self):
+        """Fetch the whole port mapping table."""
+        if self._connection_type is None:
+            connection_type = (
+                await self.fritzbox_tools.async_call_action(
+                    "Layer3Forwarding:1", "GetDefaultConnectionService"
+                )
+            )["NewDefaultConnectionService"]
+            self._connection_type = connection_type[2:].replace(".", ":")
+
+        service_name = self.connection_type.replace(":", "")
+        actions = self.fritzbox_tools.connection.services[service_name].actions
+        if "GetListOfPortMappings" in actions:
+            return await self._async_fetch_listing()
+
+        port_forwards_count: int = (
+            await self.fritzbox_tools.async_call_action(
+                self.connection_type, "GetPortMappingNumberOfEntries"
+            )
+        )["NewPortMappingNumberOfEntries"]
+        _LOGGER.debug(f"Number of port forwards: {port_forwards_count}")
+
+        entries = await asyncio.gather(
+            *(self._async_fetch_entry(idx) for idx in range(port_forwards_count))
+        )
+        return PortMappingTable(
+            {idx: entry for idx, entry in enumerate(entries) if entry is not None}
+        )
+
+    async def _async_fetch_entry(self, idx):
+        """Fetch the entry with the given index, None for port ranges."""
+        try:
+            return await self.fritzbox_tools.async_call_action(
+                self.connection_type,
+                "GetGenericPortMappingEntry",
+                NewPortMappingIndex=idx,
+            )
+        except ValueError:
+            _LOGGER.error(
+                "Do not use port forwarding ranges or disable port forwarding switches!"
+            )
+            return None
+
+    async def _async_fetch_protocol_listing(self, protocol):
+        """Return the port listing of a protocol, None if there are no forwards of it."""
+        # pylint: disable=import-error
+        from fritzconnection.core.exceptions import FritzLookUpError
+
+        try:
+            listing = await self.fritzbox_tools.async_call_action(
+                self.connection_type,
+                "GetListOfPortMappings",
+                NewStartPort=1,
+                NewEndPort=65535,
+                NewProtocol=protocol,
+                NewManage=True,
+                NewNumberOfPorts=0,
+            )
+        except FritzLookUpError:
+            return None  # 714 NoSuchEntryInArray
+        return listing.get("NewPortListing") or None
+
+    async def _async_fetch_listing(self):
+        """Fetch the whole table with one GetListOfPortMappings per protocol."""
+        listings = await asyncio.gather(
+            *(self._async_fetch_protocol_listing(protocol) for protocol in LISTING_PROTOCOLS)
+        )
+        entries = {}
+        for listing in listings:
+            if listing is None:
+                continue
+            for record in parse_list(listing, PORT_MAPPING):
+                entry = {
+                    name: record.get(field) for field, name in LISTING_FIELDS.items()
+                }
+                entry["NewRemoteHost"] = entry["NewRemoteHost"] or ""
+                entry["NewPortMappingDescription"] = entry["NewPortMappingDescription"] or ""
+                entry["NewLeaseDuration"] = entry["NewLeaseDuration"] or 0
+                entries[len(entries)] = entry
+        return PortMappingTable(entries)
+
+
+class DeflectionSource(FritzBoxDataSource):
+    """Deflections of the X_AVM-DE_OnTel service, parsed once per cycle and indexed by DeflectionId."""
+
+    name = SOURCE_DEFLECTIONS
+
+    async def async_fetch(self):
+        """Fetch and parse the deflection list."""
+        deflection_list = (
+            await self.fritzbox_tools.async_call_action(
+                "X_AVM-DE_OnTel:1", "GetDeflections"
+            )
+        )["NewDeflectionList"]
+        return {
+            deflection["DeflectionId"]: deflection
+            for deflection in parse_list(deflection_list, DEFLECTION)
+        }
+
+
+class ProfileSource(FritzBoxDataSource):
+    """State of all access profiles."""
+
+    name = SOURCE_PROFILES
+    max_update_interval = datetime.timedelta(minutes=10)
+
+    async def async_fetch(self):
+        """Fetch the states of all profiles from the profile overview with one request."""
+        return await self.fritzbox_tools.async_call_profiles(
+            "get_states", self.fritzbox_tools.profile_list
+        )
+
+
+class ConnectivitySource(FritzBoxDataSource):
+    """Internet connectivity and the attributes of the connectivity sensor.
+
+    The external addresses only change with a new connection, so they are fetched again
+    only if the connection status changed or the uptime of the connection was reset.
+    """
+
+    name = SOURCE_CONNECTIVITY
+    update_interval = datetime.timedelta(seconds=60)
+    min_update_interval = datetime.timedelta(seconds=30)
+
+    def __init__(self, fritzbox_tools):
+        """Init connectivity source."""
+        super().__init__(fritzbox_tools)
+        self._addresses = None
+        self._last_status = None
+        self._last_uptime = None
+
+    async def async_fetch(self):
+        """Fetch connectivity state."""
+        fritzbox_tools = self.fritzbox_tools
+        status_info_request = fritzbox_tools.async_call_action(
+            "WANIPConn", "GetStatusInfo"
+        )
+        if "WANCommonInterfaceConfig1" in fritzbox_tools.connection.services:
+            link_properties, status_info = await asyncio.gather(
+                fritzbox_tools.async_call_action(
+                    "WANCommonInterfaceConfig1", "GetCommonLinkProperties"
+                ),
+                status_info_request,
+            )
+            is_on = link_properties["NewPhysicalLinkStatus"] == "Up"
+        else:
+            status_info = await status_info_request
+            is_on = status_info["NewConnectionStatus"] == "Connected"
+
+        status = status_info["NewConnectionStatus"]
+        uptime = status_info["NewUptime"]
+        if (
+            self._addresses is None
+            or status != self._last_status
+            or uptime < self._last_uptime
+        ):
+            _LOGGER.debug("Connection changed, fetching external IP addresses")
+            self._addresses = await self._async_fetch_addresses()
+        self._last_status = status
+        self._last_uptime = uptime
+
+        return {
+            "is_on": is_on,
+            "uptime": uptime,
+            "modelname": fritzbox_tools.connection.modelname,
+            **self._addresses,
+        }
+
+    @property
+    def event_services(self):
+        """Return the IGD services of the internet connection."""
+        return ["WANIPConn1", "WANCommonIFC1"]
+
+    def apply_event(self, data, service_name, variables):
+        """Apply a new external IP address, fetch everything again if the connection state changed."""
+        if "ConnectionStatus" in variables or "PhysicalLinkStatus" in variables:
+            return None
+        if "ExternalIPAddress" in variables:
+            return {**data, "external_ip": variables["ExternalIPAddress"]}
+        return data
+
+    def has_changed(self, old_data, new_data):
+        """Return True if anything but the growing uptime changed."""
+        return new_data["uptime"] < old_data["uptime"] or any(
+            old_data[key] != new_data[key] for key in new_data if key != "uptime"
+        )
+
+    async def _async_fetch_addresses(self):
+        """Fetch the external IPv4 and IPv6 address."""
+        external_ip, external_ipv6 = await asyncio.gather(
+            self.fritzbox_tools.async_call_action("WANIPConn", "GetExternalIPAddress"),
+            self.fritzbox_tools.async_call_action(
+                "WANIPConn", "X_AVM_DE_GetExternalIPv6Address"
+            ),
+        )
+        return {
+            "external_ip": external_ip["NewExternalIPAddress"],
+            "external_ipv6": external_ipv6["NewExternalIPv6Address"],
+        }
+
+
+class HostsSource(FritzBoxDataSource):
+    """All hosts known to the box, indexed by MAC address.
+
+    The host list is downloaded as one xml file instead of one GetGenericHostEntry call per host,
+    and only if the change counter of the host list changed since the last download. Otherwise
+    the previous data is returned as is, so the source can be polled every few seconds.
+    """
+
+    name = SOURCE_HOSTS
+    update_interval = datetime.timedelta(seconds=5)
+    min_update_interval = datetime.timedelta(seconds=5)
+    max_update_interval = datetime.timedelta(seconds=30)
+
+    def __init__(self, fritzbox_tools):
+        """Init hosts source."""
+        super().__init__(fritzbox_tools)
+        self._hosts = None
+        self._change_counter = None
+
+    async def async_fetch(self):
+        """Fetch the host list if it changed."""
+        fritzbox_tools = self.fritzbox_tools
+        change_counter = None
+        if "X_AVM-DE_GetChangeCounter" in fritzbox_tools.connection.services["Hosts1"].actions:
+            result = await fritzbox_tools.async_call_action(
+                "Hosts1", "X_AVM-DE_GetChangeCounter"
+            )
+            change_counter = result["NewX_AVM-DE_GetChangeCounter"]
+            if self._hosts is not None and change_counter == self._change_counter:
+                return self._hosts
+
+        self._hosts = await self._async_fetch_hosts()
+        self._change_counter = change_counter
+        return self._hosts
+
+    def has_changed(self, old_data, new_data):
+        """Return True if a new host list was downloaded and differs from the old one."""
+        return new_data is not old_data and new_data != old_data
+
+    async def _async_fetch_hosts(self):
+        """Download the host list."""
+        result = await self.fritzbox_tools.async_call_action(
+            "Hosts1", "X_AVM-DE_GetHostListPath"
+        )
+        records = await self.fritzbox_tools.async_download_list(
+            "Hosts1", result["NewX_AVM-DE_HostListPath"], HOST
+        )
+        hosts = {}
+        for record in records:
+            mac = record.get("MACAddress")
+            if not mac:
+                continue
+            hosts[mac.upper()] = {
+                "ip_address": record.get("IPAddress"),
+                "hostname": record.get("HostName"),
+                "is_connected": record.get("Active", False),
+                "interface_type": record.get("InterfaceType"),
+            }
+        return hosts
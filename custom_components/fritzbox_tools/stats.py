@@ -0,0 +1,109 @@
+"""Latency statistics of the requests to a FRITZ!Box."""
+import asyncio
+import bisect
+import threading
+
+# upper bounds of the histogram buckets in milliseconds, the last bucket is unbounded
+BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Latency histogram with error and timeout counts of one action."""
+
+    def __init__(self):
+        """Init histogram."""
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total = 0.0  # seconds
+        self.max = 0.0  # seconds
+
+    def add(self, duration, error=None):
+        """Add a call which took `duration` seconds and failed with `error` if given."""
+        self.buckets[bisect.bisect_left(BUCKETS, duration * 1000)] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        # cancelled calls ran into the timeout of a caller
+        timeouts = (asyncio.TimeoutError, TimeoutError, asyncio.CancelledError)
+        if isinstance(error, timeouts) or isinstance(getattr(error, "__cause__", None), timeouts):
+            self.timeouts += 1
+        elif error is not None:
+            self.errors += 1
+
+    def percentile(self, fraction):
+        """Return the upper bound (ms) of the bucket which contains the given fraction of all calls.
+
+        Returns None if it is the unbounded bucket or there were no calls.
+        """
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        """Return the histogram as dict."""
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "mean_ms": round(self.total * 1000 / self.count, 1) if self.count else None,
+            "max_ms": round(self.max * 1000, 1),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "buckets": {
+                **{f"<={bound}ms": count for bound, count in zip(BUCKETS, self.buckets)},
+                f">{BUCKETS[-1]}ms": self.buckets[-1],
+            },
+        }
+
+
+class CallStatistics:
+    """Latency histograms per (service, action) of all calls to a box.
+
+    Calls are recorded from the event loop as well as from executor threads.
+    """
+
+    def __init__(self):
+        """Init statistics."""
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, service_name, action_name, duration, error=None):
+        """Record a call which took `duration` seconds."""
+        with self._lock:
+            histogram = self._histograms.get((service_name, action_name))
+            if histogram is None:
+                histogram = self._histograms[(service_name, action_name)] = LatencyHistogram()
+            histogram.add(duration, error)
+
+    def get(self, service_name, action_name):
+        """Return the histogram of an action or None if it was not called yet."""
+        return self._histograms.get((service_name, action_name))
+
+    def calls(self):
+        """Return the (service, action) pairs of all recorded calls."""
+        with self._lock:
+            return list(self._histograms)
+
+    def reset(self):
+        """Drop all recorded calls."""
+        with self._lock:
+            self._histograms = {}
+
+    def as_dict(self):
+        """Return the histograms keyed by "service.action", slowest mean first."""
+        with self._lock:
+            histograms = sorted(
+                self._histograms.items(),
+                key=lambda item: item[1].total / item[1].count,
+                reverse=True,
+            )
+            return {
+                f"{service_name}.{action_name}": histogram.as_dict()
+                for (service_name, action_name), histogram in histograms
+            }
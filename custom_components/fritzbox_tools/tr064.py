@@ -0,0 +1,276 @@
+"""Asyncio TR-064 SOAP client for the FRITZ!Box."""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from xml.etree import ElementTree as etree
+
+import aiohttp
+
+from .lists import ListParser
+
+_LOGGER = logging.getLogger(__name__)
+
+CHALLENGE_REGEX = re.compile(r'(\w+)=(?:"([^"]*)"|([^\s,]*))')
+
+# keep connections to the box open between two update cycles
+KEEPALIVE_TIMEOUT = 60  # seconds
+CONNECTION_LIMIT = 4
+DOWNLOAD_CHUNK_SIZE = 16384
+
+
+def _md5(value):
+    return hashlib.md5(value.encode("utf-8")).hexdigest()
+
+
+def create_session(limit=CONNECTION_LIMIT):
+    """Return a session with a persistent connection pool for one box, which counts reused connections."""
+    stats = {"connections_created": 0, "connections_reused": 0}
+
+    async def on_connection_create_end(session, context, params):
+        stats["connections_created"] += 1
+
+    async def on_connection_reuseconn(session, context, params):
+        stats["connections_reused"] += 1
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=limit, keepalive_timeout=KEEPALIVE_TIMEOUT
+        ),
+        trace_configs=[trace_config],
+    )
+    return session, stats
+
+
+class AsyncFritzConnection:
+    """Execute TR-064 actions directly on the event loop.
+
+    The service descriptions (service types, control urls and argument types) are taken
+    from an already initialized fritzconnection `FritzConnection`, the requests itself are
+    sent with a pooled keep-alive aiohttp session instead of blocking an executor thread.
+    The digest challenge of the box is remembered, so following requests authenticate
+    preemptively and need a single round trip.
+    """
+
+    def __init__(self, connection, user, password, connection_limit=CONNECTION_LIMIT):
+        """Init async connection."""
+        self._session, self._stats = create_session(connection_limit)
+        self._connection = connection
+        self._user = user
+        self._password = password
+        self._timeout = aiohttp.ClientTimeout(total=connection.timeout)
+        self._url = f"{connection.address}:{connection.port}"
+
+        self._challenge = None  # params of the last digest challenge
+        self._nonce_count = 0
+        self._stats.update({"requests": 0, "auth_challenges": 0, "auth_retries": 0})
+
+    @property
+    def stats(self):
+        """Return counters of requests, created and reused connections and digest challenges.
+
+        `auth_challenges` counts all 401 answers, `auth_retries` only those of requests which
+        were already sent with preemptive authorization (i.e. the nonce got stale).
+        """
+        return dict(self._stats)
+
+    async def async_close(self):
+        """Close the connection pool."""
+        await self._session.close()
+
+    @property
+    def session(self):
+        """Return the pooled session of the box."""
+        return self._session
+
+    @property
+    def url(self):
+        """Return the base url of the box."""
+        return self._url
+
+    @property
+    def services(self):
+        """Return the services of the box."""
+        return self._connection.services
+
+    async def call_action(self, service_name, action_name, *, arguments=None, **kwargs):
+        """Execute the given action of the given service. Same signature as FritzConnection.call_action.
+
+        Raises the fritzconnection exceptions, also if the box cannot be reached (with the
+        aiohttp error or timeout as cause).
+        """
+        # pylint: disable=import-error
+        from fritzconnection import FritzConnection
+        from fritzconnection.core.exceptions import (
+            FritzConnectionException,
+            FritzServiceError,
+        )
+        from fritzconnection.core.soaper import Soaper, preprocess_arguments
+
+        arguments = arguments if arguments else dict()
+        if not arguments:
+            arguments.update(kwargs)
+        service_name = FritzConnection.normalize_name(service_name)
+        try:
+            service = self.services[service_name]
+        except KeyError:
+            raise FritzServiceError(f'unknown service: "{service_name}"')
+
+        headers = Soaper.headers.copy()
+        headers["soapaction"] = f"{service.serviceType}#{action_name}"
+        arguments = "".join(
+            Soaper.argument_template.format(name=k, value=v)
+            for k, v in preprocess_arguments(arguments).items()
+        )
+        body = Soaper.body_template.format(
+            service_type=service.serviceType,
+            action_name=action_name,
+            arguments=arguments,
+        )
+        envelope = Soaper.envelope.format(body=body).encode("utf-8")
+
+        try:
+            status, content = await self._post(service.controlURL, envelope, headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise FritzConnectionException(
+                f"Unable to reach the FRITZ!Box for {service_name} {action_name}: {err!r}"
+            ) from err
+        if status != 200:
+            self._raise_fritzconnection_error(content)
+        return self._parse_response(content, service, action_name)
+
+    async def _post(self, path, data, headers):
+        """Post the request, answer a digest challenge of the box once. Returns status and content."""
+        for _ in range(2):
+            preemptive = self._challenge is not None
+            request_headers = dict(headers)
+            if preemptive:
+                request_headers["Authorization"] = self._authorization("POST", path)
+
+            self._stats["requests"] += 1
+            async with self._session.post(
+                self._url + path,
+                data=data,
+                headers=request_headers,
+                timeout=self._timeout,
+            ) as response:
+                content = await response.read()
+                challenge = response.headers.get("WWW-Authenticate", "")
+                if response.status != 401 or not challenge.startswith("Digest"):
+                    return response.status, content
+
+            self._stats["auth_challenges"] += 1
+            if preemptive:
+                self._stats["auth_retries"] += 1
+            self._challenge = {
+                key: quoted or unquoted
+                for key, quoted, unquoted in CHALLENGE_REGEX.findall(challenge)
+            }
+            self._nonce_count = 0
+        return response.status, content
+
+    def _authorization(self, method, path):
+        """Return the digest authorization header (RFC 2617) for the last challenge of the box."""
+        params = self._challenge
+        realm = params.get("realm", "")
+        nonce = params.get("nonce", "")
+        ha1 = _md5(f"{self._user}:{realm}:{self._password}")
+        ha2 = _md5(f"{method}:{path}")
+        authorization = (
+            f'Digest username="{self._user}", realm="{realm}", nonce="{nonce}", '
+            f'uri="{path}", algorithm=MD5'
+        )
+        if "auth" in params.get("qop", "").split(","):
+            self._nonce_count += 1
+            nc = f"{self._nonce_count:08x}"
+            cnonce = os.urandom(8).hex()
+            response = _md5(f"{ha1}:{nonce}:{nc}:{cnonce}:auth:{ha2}")
+            authorization += f', qop=auth, nc={nc}, cnonce="{cnonce}"'
+        else:
+            response = _md5(f"{ha1}:{nonce}:{ha2}")
+        authorization += f', response="{response}"'
+        if "opaque" in params:
+            authorization += f', opaque="{params["opaque"]}"'
+        return authorization
+
+    async def download_list(self, path, record_type):
+        """Download an xml list of the box (e.g. the host list path) and return its records.
+
+        The list is parsed while it is downloaded, so it is never held in memory as a whole.
+        Raises FritzConnectionException if the box cannot be reached or answers with an error.
+        """
+        # pylint: disable=import-error
+        from fritzconnection.core.exceptions import FritzConnectionException
+
+        parser = ListParser(record_type)
+        records = []
+        url = path if "://" in path else self._url + path
+        self._stats["requests"] += 1
+        try:
+            async with self._session.get(url, timeout=self._timeout) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    records.extend(parser.feed(chunk))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise FritzConnectionException(f"Unable to download {path}: {err!r}") from err
+        records.extend(parser.close())
+        return records
+
+    @staticmethod
+    def _parse_response(content, service, action_name):
+        """Return the out-arguments of the response converted to python types, like fritzconnection does."""
+        # pylint: disable=import-error
+        from fritzconnection.core.soaper import get_argument_value, get_converted_value
+
+        result = dict()
+        action = service.actions[action_name]
+        root = etree.fromstring(content)
+        for argument_name in action.arguments:
+            try:
+                value = get_argument_value(root, argument_name)
+            except AttributeError:
+                continue
+            state_variable_name = action.arguments[argument_name].relatedStateVariable
+            data_type = service.state_variables[state_variable_name].dataType.lower()
+            try:
+                value = get_converted_value(data_type, value)
+            except ValueError:
+                # ignore malformed value and return 'as is'.
+                pass
+            result[argument_name] = value
+        return result
+
+    @staticmethod
+    def _raise_fritzconnection_error(content):
+        """Raise the fritzconnection exception matching the error code of the response."""
+        # pylint: disable=import-error
+        from fritzconnection.core.exceptions import (
+            FRITZ_ERRORS,
+            FritzConnectionException,
+        )
+        from fritzconnection.core.utils import localname
+
+        try:
+            root = etree.fromstring(content)
+        except etree.ParseError:
+            # html instead of xml, e.g. on wrong authentication
+            detail = re.sub(r"<.*?>", "", content.decode("utf-8", "replace"))
+            raise FritzConnectionException(f"Unable to perform operation. {detail}")
+
+        parts = []
+        error_code = None
+        detail = root.find(".//detail")
+        if detail is not None:
+            for node in detail.iter():
+                if node is detail:
+                    continue
+                tag = localname(node)
+                text = (node.text or "").strip()
+                if tag == "errorCode":
+                    error_code = text
+                parts.append(f"{tag}: {text}")
+        raise FRITZ_ERRORS.get(error_code, FritzConnectionException)("\n".join(parts))
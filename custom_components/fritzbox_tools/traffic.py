@@ -0,0 +1,213 @@
+"""Sampling of the WAN byte counters of the FRITZ!Box and the rates computed from them."""
+from array import array
+import datetime
+import logging
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = datetime.timedelta(seconds=1)
+PUBLISH_INTERVAL = datetime.timedelta(seconds=30)
+
+
+class CounterRingBuffer:
+    """Fixed-size ring buffer of (timestamp, bytes sent, bytes received) samples.
+
+    The samples are stored in preallocated arrays, so sampling does not allocate. A counter
+    which goes backwards (reconnect or reboot of the box) starts the buffer over.
+    """
+
+    def __init__(self, size):
+        """Init ring buffer with room for `size` samples."""
+        self.size = size
+        self._times = array("d", [0.0]) * size
+        self._sent = array("Q", [0]) * size
+        self._received = array("Q", [0]) * size
+        self._next = 0
+        self.count = 0
+
+    def _index(self, age):
+        """Return the index of the sample `age` samples before the newest one."""
+        return (self._next - 1 - age) % self.size
+
+    def add(self, timestamp, sent, received):
+        """Add a sample."""
+        if self.count:
+            last = self._index(0)
+            if sent < self._sent[last] or received < self._received[last]:
+                self.count = 0
+        self._times[self._next] = timestamp
+        self._sent[self._next] = sent
+        self._received[self._next] = received
+        self._next = (self._next + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def rates(self, window, now=None):
+        """Return the mean and peak upload and download rates (bytes/s) of the last `window` seconds.
+
+        The window ends at `now` (default: the monotonic clock), not at the newest sample, so
+        the rates expire when sampling stops. The peak is the highest rate between two
+        consecutive samples. Returns None without two samples in the window.
+        """
+        if self.count < 2:
+            return None
+        if now is None:
+            now = time.monotonic()
+        start = now - window
+        newest = self._index(0)
+        if self._times[newest] < start:
+            return None
+        oldest = newest
+        peak_sent = peak_received = 0.0
+        for age in range(1, self.count):
+            idx = self._index(age)
+            if self._times[idx] < start:
+                break
+            duration = self._times[oldest] - self._times[idx]
+            if duration > 0:
+                peak_sent = max(peak_sent, (self._sent[oldest] - self._sent[idx]) / duration)
+                peak_received = max(
+                    peak_received, (self._received[oldest] - self._received[idx]) / duration
+                )
+            oldest = idx
+        duration = self._times[newest] - self._times[oldest]
+        if duration <= 0:
+            return None
+        return {
+            "sent": (self._sent[newest] - self._sent[oldest]) / duration,
+            "received": (self._received[newest] - self._received[oldest]) / duration,
+            "peak_sent": peak_sent,
+            "peak_received": peak_received,
+        }
+
+    def latest(self):
+        """Return the newest (timestamp, sent, received) sample or None."""
+        if not self.count:
+            return None
+        idx = self._index(0)
+        return self._times[idx], self._sent[idx], self._received[idx]
+
+
+class TrafficSampler:
+    """Sample the byte counters of the WAN interface with one GetAddonInfos call per tick.
+
+    The rates are computed from a ring buffer holding one publish interval of samples, the
+    listeners (the sensors) are notified only once per publish interval with the mean and
+    peak rates of that interval, so fine sampling does not flood the recorder.
+
+    The sampler only runs while it has listeners, i.e. while a traffic sensor is enabled. It
+    samples every `sample_interval` while a listener needs the rates and once per publish
+    interval while only the totals are needed.
+    """
+
+    def __init__(
+        self,
+        fritzbox_tools,
+        sample_interval=SAMPLE_INTERVAL,
+        publish_interval=PUBLISH_INTERVAL,
+    ):
+        """Init traffic sampler."""
+        self.fritzbox_tools = fritzbox_tools
+        self.sample_interval = sample_interval
+        self.publish_interval = publish_interval
+        self.buffer = CounterRingBuffer(int(publish_interval / sample_interval) + 2)
+        self.data = None
+        self._listeners = []
+        self._rate_listeners = 0
+        self._unsubscribe = []
+        self._interval = None  # current sample interval, None while stopped
+        self._sampling = False
+
+    @callback
+    def async_add_listener(self, update_callback, rates=True):
+        """Add a listener which is called with every published interval, return a function to remove it.
+
+        Listeners which only need the totals pass `rates=False`.
+        """
+        self._listeners.append(update_callback)
+        if rates:
+            self._rate_listeners += 1
+        self._async_schedule()
+
+        @callback
+        def remove_listener():
+            self._listeners.remove(update_callback)
+            if rates:
+                self._rate_listeners -= 1
+            self._async_schedule()
+
+        return remove_listener
+
+    @callback
+    def _async_schedule(self):
+        """Start, stop or change the sampling for the current listeners."""
+        if self._rate_listeners:
+            interval = self.sample_interval
+        elif self._listeners:
+            interval = self.publish_interval
+        else:
+            interval = None
+        if interval == self._interval:
+            return
+        self.async_stop()
+        if interval is None:
+            return
+        hass = self.fritzbox_tools.hass
+        self._interval = interval
+        self._unsubscribe = [
+            async_track_time_interval(hass, self._async_sample, interval),
+            async_track_time_interval(hass, self._async_publish, self.publish_interval),
+        ]
+        hass.async_create_task(self._async_sample())
+
+    @callback
+    def async_stop(self):
+        """Stop sampling and publishing."""
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe = []
+        self._interval = None
+
+    async def _async_sample(self, now=None):
+        """Add a sample of the byte counters to the ring buffer."""
+        if self._sampling:
+            # the box did not answer the last sample yet
+            return
+        self._sampling = True
+        try:
+            info = await self.fritzbox_tools.async_call_action(
+                "WANCommonIFC1", "GetAddonInfos"
+            )
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.debug("Could not sample the traffic of the FRITZ!Box", exc_info=True)
+            return
+        finally:
+            self._sampling = False
+
+        # the 64 bit counters are missing on old FRITZ!OS versions
+        sent = info.get("NewX_AVM_DE_TotalBytesSent64") or info["NewTotalBytesSent"]
+        received = (
+            info.get("NewX_AVM_DE_TotalBytesReceived64") or info["NewTotalBytesReceived"]
+        )
+        self.buffer.add(time.monotonic(), int(sent), int(received))
+
+    @callback
+    def _async_publish(self, now=None):
+        """Compute the rates of the last publish interval and notify the listeners.
+
+        The data is None if there is no sample of the last two publish intervals, the rates
+        are missing without two samples in the last publish interval.
+        """
+        now = time.monotonic()
+        window = self.publish_interval.total_seconds()
+        latest = self.buffer.latest()
+        if latest is None or latest[0] < now - 2 * window:
+            self.data = None
+        else:
+            rates = self.buffer.rates(window, now) or {}
+            self.data = {**rates, "total_sent": latest[1], "total_received": latest[2]}
+        for update_callback in list(self._listeners):
+            update_callback()
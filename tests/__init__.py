@@ -0,0 +1 @@
+"""Tests of FRITZ!Box Tools against the simulated FRITZ!Box."""
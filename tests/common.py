@@ -0,0 +1,11 @@
+"""Helpers of the FRITZ!Box Tools tests."""
+import asyncio
+import time
+
+
+async def async_wait_until(condition, timeout=5):
+    """Wait until `condition()` is true, fail after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for the condition"
+        await asyncio.sleep(0.01)
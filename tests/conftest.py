@@ -0,0 +1,11 @@
+"""Fixtures of the FRITZ!Box Tools tests."""
+import pytest
+
+from benchmarks.simulator import FritzBoxSimulator
+
+
+@pytest.fixture
+def simulator():
+    """Return a running simulated FRITZ!Box with call monitor."""
+    with FritzBoxSimulator(call_monitor_port=0) as simulator:
+        yield simulator
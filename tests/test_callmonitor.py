@@ -0,0 +1,198 @@
+"""Tests of the call monitor listener."""
+import asyncio
+import socket
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import callback  # noqa: E402
+
+from custom_components.fritzbox_tools import callmonitor  # noqa: E402
+from custom_components.fritzbox_tools.callmonitor import (  # noqa: E402
+    CallMonitorProtocol,
+    FritzBoxCallMonitor,
+    parse_line,
+)
+from custom_components.fritzbox_tools.const import EVENT_CALL  # noqa: E402
+
+from .common import async_wait_until  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "line, event",
+    [
+        (
+            b"17.10.26 20:15:01;RING;0;0301234567;987654;SIP0;",
+            {
+                "type": "ring",
+                "date": "17.10.26 20:15:01",
+                "connection_id": 0,
+                "from": "0301234567",
+                "to": "987654",
+                "line": "SIP0",
+            },
+        ),
+        (
+            b"17.10.26 20:15:01;CALL;1;10;987654;0301234567;SIP1;",
+            {
+                "type": "call",
+                "date": "17.10.26 20:15:01",
+                "connection_id": 1,
+                "device": "10",
+                "from": "987654",
+                "to": "0301234567",
+                "line": "SIP1",
+            },
+        ),
+        (
+            b"17.10.26 20:15:04;CONNECT;0;10;0301234567;",
+            {
+                "type": "connect",
+                "date": "17.10.26 20:15:04",
+                "connection_id": 0,
+                "device": "10",
+                "number": "0301234567",
+            },
+        ),
+        (
+            b"17.10.26 20:16:04;DISCONNECT;0;60;",
+            {
+                "type": "disconnect",
+                "date": "17.10.26 20:16:04",
+                "connection_id": 0,
+                "duration": 60,
+            },
+        ),
+        (
+            b"17.10.26 20:16:04;DISCONNECT;0;;",
+            {
+                "type": "disconnect",
+                "date": "17.10.26 20:16:04",
+                "connection_id": 0,
+                "duration": 0,
+            },
+        ),
+        (b"17.10.26 20:16:04;UNKNOWN;0;", None),
+    ],
+)
+def test_parse_line(line, event):
+    """Every event type is parsed into its fields, unknown lines are ignored."""
+    assert parse_line(bytearray(line)) == event
+
+
+def test_parse_line_in_place():
+    """A line is parsed within the given bounds of the buffer."""
+    buffer = bytearray(
+        b"17.10.26 20:15:01;RING;0;0301234567;987654;SIP0;\r\n"
+        b"17.10.26 20:16:04;DISCONNECT;0;60;\r\n"
+    )
+    start = buffer.index(b"\n") + 1
+    event = parse_line(buffer, start, len(buffer) - 1)
+    assert event["type"] == "disconnect"
+    assert event["duration"] == 60
+
+
+def test_protocol_reassembles_lines():
+    """Lines split across chunks and several lines in one chunk are all parsed once."""
+    events = []
+    protocol = CallMonitorProtocol(events.append, lambda exc: None)
+    protocol.data_received(b"17.10.26 20:15:01;RING;0;0301234567;98")
+    assert events == []
+    protocol.data_received(
+        b"7654;SIP0;\r\n17.10.26 20:15:04;CONNECT;0;10;0301234567;\r\n17.10.26 20:16"
+    )
+    protocol.data_received(b":04;DISCONNECT;0;60;\r\n")
+    assert [event["type"] for event in events] == ["ring", "connect", "disconnect"]
+    assert events[0]["to"] == "987654"
+
+
+def test_protocol_drops_overlong_line():
+    """Garbage without line breaks does not grow the buffer without bounds."""
+    events = []
+    protocol = CallMonitorProtocol(events.append, lambda exc: None)
+    protocol.data_received(b"x" * (callmonitor.MAX_LINE_LENGTH + 1))
+    protocol.data_received(b"\r\n17.10.26 20:16:04;DISCONNECT;0;60;\r\n")
+    assert [event["type"] for event in events] == ["disconnect"]
+
+
+@pytest.fixture
+async def start_monitor(hass, simulator):
+    """Return a function which starts a call monitor of a stand-in box, stopped after the test.
+
+    It returns the monitor and the events fired on the bus.
+    """
+    call_monitors = []
+
+    def start(port=None):
+        events = []
+
+        @callback
+        def record_event(event):
+            events.append(event.data)
+
+        hass.bus.async_listen(EVENT_CALL, record_event)
+        fritzbox_tools = SimpleNamespace(hass=hass, host=simulator.host)
+        call_monitor = FritzBoxCallMonitor(
+            fritzbox_tools, port=simulator.call_monitor_port if port is None else port
+        )
+        call_monitors.append(call_monitor)
+        call_monitor.async_start()
+        return call_monitor, events
+
+    yield start
+    for call_monitor in call_monitors:
+        call_monitor.async_stop()
+
+
+async def test_fires_call_events(simulator, start_monitor):
+    """The events of a call are fired with the host of the box."""
+    call_monitor, events = start_monitor()
+    await async_wait_until(lambda: call_monitor.connected and simulator.call_monitor_clients)
+    simulator.simulate_call(caller="0301234567", callee="987654", duration=5)
+    await async_wait_until(lambda: len(events) == 3)
+
+    ring, connect, disconnect = events
+    assert ring["host"] == simulator.host
+    assert (ring["type"], ring["from"], ring["to"]) == ("ring", "0301234567", "987654")
+    assert (connect["type"], connect["number"]) == ("connect", "0301234567")
+    assert (disconnect["type"], disconnect["duration"]) == ("disconnect", 5)
+
+
+async def test_reconnects_after_connection_loss(simulator, start_monitor, monkeypatch):
+    """The monitor connects again when the box closes the connection."""
+    monkeypatch.setattr(callmonitor, "MIN_RECONNECT_DELAY", 0.01)
+    call_monitor, events = start_monitor()
+    await async_wait_until(lambda: call_monitor.connected and simulator.call_monitor_clients)
+
+    simulator.drop_call_monitor_clients()
+    await async_wait_until(lambda: not call_monitor.connected)
+    await async_wait_until(lambda: call_monitor.connected and simulator.call_monitor_clients)
+    simulator.send_call_event("RING", 3, "0301234567", "987654", "SIP0")
+    await async_wait_until(lambda: events)
+    assert events[0]["connection_id"] == 3
+
+
+async def test_reconnect_backoff(simulator, start_monitor, monkeypatch):
+    """Failed connects are retried with an exponential backoff up to the maximum delay."""
+    with socket.socket() as sock:
+        sock.bind((simulator.host, 0))
+        closed_port = sock.getsockname()[1]
+
+    delays = []
+
+    async def record_sleep(delay):
+        delays.append(delay)
+        await asyncio.sleep(0)
+
+    # only the delays of the call monitor are recorded, not those of the event loop
+    monkeypatch.setattr(
+        callmonitor,
+        "asyncio",
+        SimpleNamespace(get_running_loop=asyncio.get_running_loop, sleep=record_sleep),
+    )
+    call_monitor, _ = start_monitor(port=closed_port)
+    await async_wait_until(lambda: len(delays) >= 11)
+    assert not call_monitor.connected
+    assert delays[:11] == [1, 2, 4, 8, 16, 32, 64, 128, 256, 300, 300]
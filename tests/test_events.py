@@ -0,0 +1,143 @@
+"""Tests of the event subscriptions against the simulator."""
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+aiohttp = pytest.importorskip("aiohttp")
+
+from custom_components.fritzbox_tools import events  # noqa: E402
+from custom_components.fritzbox_tools.breaker import CircuitBreaker  # noqa: E402
+from custom_components.fritzbox_tools.const import SOURCE_WIFI  # noqa: E402
+from custom_components.fritzbox_tools.coordinator import FritzBoxUpdateCoordinator  # noqa: E402
+from custom_components.fritzbox_tools.events import FritzBoxEventListener  # noqa: E402
+from custom_components.fritzbox_tools.executor import FritzBoxExecutor  # noqa: E402
+from custom_components.fritzbox_tools.sources import WifiSource  # noqa: E402
+
+from .common import async_wait_until  # noqa: E402
+
+WLAN3_EVENT_PATH = "/upnp/event/wlanconfiguration3"
+
+
+class FritzBoxToolsStandIn:
+    """The parts of FritzBoxTools used by the coordinator and the event listener, answered by the simulator."""
+
+    def __init__(self, hass, simulator, session):
+        """Init stand-in."""
+        self.hass = hass
+        self.simulator = simulator
+        self.host = simulator.host
+        self.port = simulator.port
+        self.connection = SimpleNamespace(
+            services={
+                name: SimpleNamespace(eventSubURL=f"/upnp/event/{name.lower()}")
+                for name in simulator.services
+            }
+        )
+        self.async_connection = SimpleNamespace(
+            session=session, url=f"http://{simulator.host}:{simulator.port}"
+        )
+        self.executor = FritzBoxExecutor(simulator.host)
+        self.circuit_breaker = CircuitBreaker(simulator.host)
+        self.coordinator = FritzBoxUpdateCoordinator(hass, self, [WifiSource(self)])
+
+    async def async_call_action(self, service_name, action_name, **kwargs):
+        """Call an action of the simulator."""
+        return await self.executor.async_run(
+            self.simulator.call, service_name.replace(":", ""), action_name, kwargs
+        )
+
+
+@pytest.fixture
+async def fritzbox_tools(hass, simulator):
+    """Return a stand-in box whose data was fetched once."""
+    async with aiohttp.ClientSession() as session:
+        fritzbox_tools = FritzBoxToolsStandIn(hass, simulator, session)
+        await fritzbox_tools.coordinator.async_refresh()
+        yield fritzbox_tools
+        fritzbox_tools.executor.shutdown()
+
+
+@pytest.fixture
+async def start_listener(fritzbox_tools):
+    """Return a function which starts an event listener of the stand-in box, stopped after the test."""
+    listeners = []
+
+    async def start():
+        listener = FritzBoxEventListener(fritzbox_tools)
+        listeners.append(listener)
+        await listener.async_start()
+        return listener
+
+    yield start
+    for listener in listeners:
+        await listener.async_stop()
+
+
+@pytest.fixture
+def fast_renewal(monkeypatch):
+    """Renew the subscriptions every 50ms."""
+    monkeypatch.setattr(events, "SUBSCRIPTION_TIMEOUT", 0)
+    monkeypatch.setattr(events, "MIN_RENEW_INTERVAL", 0.05)
+
+
+async def test_notify_applies_event(simulator, fritzbox_tools, start_listener):
+    """An event of the box changes the data of its source without fetching it again."""
+    await start_listener()
+    coordinator = fritzbox_tools.coordinator
+    assert coordinator.get_source_data(SOURCE_WIFI)["2"]["NewEnable"] == "1"
+    get_info_calls = simulator.calls[("WLANConfiguration2", "GetInfo")]
+
+    with simulator.lock:
+        simulator.wlans[2] = False
+    simulator.notify("WLANConfiguration2")
+
+    # fetched values are strings, WifiSource.apply_event sets a bool
+    await async_wait_until(
+        lambda: coordinator.get_source_data(SOURCE_WIFI)["2"]["NewEnable"] is False
+        and coordinator.get_source_data(SOURCE_WIFI)["2"]["NewStatus"] == "Disabled"
+    )
+    assert simulator.calls[("WLANConfiguration2", "GetInfo")] == get_info_calls
+
+
+async def test_push_source_needs_all_services(
+    simulator, fritzbox_tools, start_listener, fast_renewal
+):
+    """A source is polled while one of its event services is not subscribed, which is tried again."""
+    simulator.event_paths.pop(WLAN3_EVENT_PATH)
+    listener = await start_listener()
+    assert sorted(listener.subscriptions.values()) == [
+        "WLANConfiguration1",
+        "WLANConfiguration2",
+    ]
+    assert SOURCE_WIFI not in fritzbox_tools.coordinator.push_sources
+
+    simulator.event_paths[WLAN3_EVENT_PATH] = "WLANConfiguration3"
+    await async_wait_until(lambda: SOURCE_WIFI in fritzbox_tools.coordinator.push_sources)
+    assert "WLANConfiguration3" in listener.subscriptions.values()
+
+
+async def test_lost_subscription_polls_until_restored(
+    simulator, fritzbox_tools, start_listener, fast_renewal
+):
+    """A source is polled again at once if the box forgets one of its subscriptions, until it is back."""
+    listener = await start_listener()
+    coordinator = fritzbox_tools.coordinator
+    assert SOURCE_WIFI in coordinator.push_sources
+    get_info_calls = simulator.calls[("WLANConfiguration3", "GetInfo")]
+
+    # like a reboot which loses the subscription and the event service of one network
+    with simulator.lock:
+        simulator.event_paths.pop(WLAN3_EVENT_PATH)
+        for sid, subscription in list(simulator.subscriptions.items()):
+            if subscription["service"] == "WLANConfiguration3":
+                del simulator.subscriptions[sid]
+
+    await async_wait_until(lambda: SOURCE_WIFI not in coordinator.push_sources)
+    await async_wait_until(
+        lambda: simulator.calls[("WLANConfiguration3", "GetInfo")] > get_info_calls
+    )
+
+    simulator.event_paths[WLAN3_EVENT_PATH] = "WLANConfiguration3"
+    await async_wait_until(lambda: SOURCE_WIFI in coordinator.push_sources)
+    assert "WLANConfiguration3" in listener.subscriptions.values()